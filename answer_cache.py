@@ -0,0 +1,63 @@
+"""Bounded, expiring cache of retrieval results and answers.
+
+Entries are keyed by document and normalized question, so "What dataset
+was used?" and "what dataset was used" share one entry. Answers also key
+on the conversation state they were produced for.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import Counter
+
+answer_cache_hits_total = Counter("ez_answer_cache_hits_total", "Questions served from the answer cache", ("kind",))
+answer_cache_misses_total = Counter("ez_answer_cache_misses_total", "Answer cache lookups that missed", ("kind",))
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question):
+    return " ".join(_NON_WORD.sub(" ", question.lower()).split())
+
+
+class AnswerCache:
+    """LRU cache with a time-to-live; values are stored as given"""
+
+    def __init__(self, max_entries=512, ttl_seconds=1800):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, kind="answer"):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                answer_cache_misses_total.inc(kind=kind)
+                return None
+            self._entries.move_to_end(key)
+        answer_cache_hits_total.inc(kind=kind)
+        return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+answer_cache = AnswerCache()
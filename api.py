@@ -0,0 +1,192 @@
+"""Stateless HTTP API over the backend.
+
+Documents are addressed by the SHA-256 of their text and everything
+needed to serve them (text, index, summary) lives in the shared on-disk
+store, so any worker process on any node can handle any request:
+
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+
+Clients may send an ``X-Session-Id`` header so token usage and budgets are
+tracked per session as well as per document, and ``?profile=sample`` (or
+``cprofile``) to profile one request; see profiling.py.
+"""
+import io
+import json
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+import backend
+import document_store
+import footprint
+import profiling
+import usage
+from index_registry import registry, document_hash
+from memory import BoundedConversationMemory
+from metrics import export_prometheus
+from utils import extract_text_and_pages_from_pdf
+
+app = FastAPI(title="EZ GenAI Research Assistant API")
+
+# Holder id for indexes used by this worker; they are shared across its requests
+_API_HOLDER = "api"
+
+
+class HistoryTurn(BaseModel):
+    question: str
+    answer: str
+
+
+class AskRequest(BaseModel):
+    question: str
+    history: list[HistoryTurn] = []
+    stream: bool = False
+
+
+class EvaluateRequest(BaseModel):
+    question: str
+    response: str
+
+
+def _load_text(doc_hash):
+    text, page_starts = document_store.load_document(doc_hash)
+    if text is None:
+        raise HTTPException(status_code=404, detail=f"Unknown document {doc_hash}")
+    return text, page_starts
+
+
+def _get_vector_store(doc_hash):
+    """Shared handle to the document's index, loaded from disk on first use"""
+    text, page_starts = _load_text(doc_hash)
+    return registry.acquire(
+        doc_hash,
+        _API_HOLDER,
+        lambda: backend.load_or_prepare_vector_store(text, page_starts, doc_hash)
+    )
+
+
+def _memory_from_history(history):
+    """Rebuild conversation memory from the turns the client sends back"""
+    if not history:
+        return None
+    memory = BoundedConversationMemory(max_turns=len(history))
+    for turn in history:
+        memory.add_turn(turn.question, turn.answer)
+    return memory
+
+
+# curl --data-binary sends form-urlencoded unless told otherwise
+_TEXT_TYPES = ("text/", "application/x-www-form-urlencoded")
+
+
+def _extract_pdf(body):
+    with footprint.measure("extract"):
+        return extract_text_and_pages_from_pdf(io.BytesIO(body))
+
+
+@app.post("/documents")
+async def ingest(request: Request, profile: Optional[str] = None):
+    """Upload a PDF or UTF-8 text body; returns the document hash (400 for anything else)"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    if "pdf" in content_type:
+        try:
+            text, page_starts = await run_in_threadpool(_extract_pdf, body)
+        except (RuntimeError, ValueError) as e:
+            # PyMuPDF's FileDataError for bodies that are not a readable PDF
+            raise HTTPException(status_code=400, detail=f"Could not read the PDF: {e}")
+    elif not content_type or content_type.startswith(_TEXT_TYPES):
+        try:
+            text, page_starts = body.decode("utf-8"), None
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Text uploads must be UTF-8")
+    else:
+        raise HTTPException(status_code=400, detail=f"Unsupported content type {content_type}; send a PDF or text")
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Could not extract any text")
+
+    doc_hash = document_hash(text)
+    if not document_store.has_document(doc_hash):
+        await run_in_threadpool(document_store.save_document, doc_hash, text, page_starts)
+    with profiling.request_profile(profile):
+        await run_in_threadpool(_get_vector_store, doc_hash)
+    return {"doc_hash": doc_hash, "characters": len(text), "pages": len(page_starts or []) or None}
+
+
+@app.get("/documents/{doc_hash}/summary")
+async def summary(doc_hash: str, profile: Optional[str] = None,
+                  x_session_id: Optional[str] = Header(default=None)):
+    # Threadpool calls (and the streamed response) run in a copy of this request's context
+    usage.bind(doc_hash=doc_hash, session_id=x_session_id)
+    text, _ = _load_text(doc_hash)
+    with profiling.request_profile(profile):
+        summary_text = await run_in_threadpool(backend.get_document_summary, text, doc_hash)
+    return {"doc_hash": doc_hash, "summary": summary_text}
+
+
+@app.post("/documents/{doc_hash}/ask")
+async def ask(doc_hash: str, body: AskRequest, profile: Optional[str] = None,
+              x_session_id: Optional[str] = Header(default=None)):
+    usage.bind(doc_hash=doc_hash, session_id=x_session_id)
+    vector_store = await run_in_threadpool(_get_vector_store, doc_hash)
+    memory = _memory_from_history(body.history)
+
+    if not body.stream:
+        with profiling.request_profile(profile):
+            return await run_in_threadpool(backend.qa_chain_with_highlighting, vector_store, body.question, memory)
+
+    # Events are pulled from different threads, which the profilers can't follow
+    if profile in profiling.MODES:
+        raise HTTPException(status_code=400, detail="profile is not supported for streamed answers; use stream=false")
+
+    # Newline-delimited JSON: token events, then one result event
+    def events():
+        for kind, payload in backend.stream_answer_with_highlighting(vector_store, body.question, memory):
+            if kind == "token":
+                yield json.dumps({"type": "token", "text": payload}) + "\n"
+            else:
+                yield json.dumps({"type": "result", **payload}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/documents/{doc_hash}/questions")
+async def questions(doc_hash: str, profile: Optional[str] = None,
+                    x_session_id: Optional[str] = Header(default=None)):
+    usage.bind(doc_hash=doc_hash, session_id=x_session_id)
+    text, _ = _load_text(doc_hash)
+    with profiling.request_profile(profile):
+        generated = await run_in_threadpool(backend.generate_logic_questions, text)
+    return {"doc_hash": doc_hash, "questions": generated}
+
+
+@app.post("/documents/{doc_hash}/evaluate")
+async def evaluate(doc_hash: str, body: EvaluateRequest, x_session_id: Optional[str] = Header(default=None)):
+    usage.bind(doc_hash=doc_hash, session_id=x_session_id)
+    text, _ = _load_text(doc_hash)
+    feedback = await run_in_threadpool(backend.evaluate_user_response, text, body.question, body.response)
+    return {"doc_hash": doc_hash, "evaluation": feedback}
+
+
+@app.get("/usage")
+async def usage_report(doc_hash: Optional[str] = None, session_id: Optional[str] = None):
+    """Tokens and estimated cost by feature seen by this worker"""
+    return usage.ledger.report(doc_hash=doc_hash, session_id=session_id)
+
+
+@app.get("/memory")
+async def memory_report():
+    """Process RSS, the memory growth of the last run of each ingestion stage and the resident indexes.
+
+    API sessions hold nothing between requests (history comes with each
+    call), so per-session holdings are only tracked by the app.
+    """
+    return {**footprint.report(include_sessions=False), "indexes": registry.memory_report()}
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(export_prometheus(), media_type="text/plain; version=0.0.4")
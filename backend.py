@@ -1,87 +1,452 @@
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.chains import RetrievalQA
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.docstore.document import Document
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain, ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
+# LangChain, FAISS and the embedding model (torch) are imported inside the
+# functions that need them, so importing backend stays cheap for the UI shell
 import json
+import os
 import re
+import time
 from groq_llm import get_groq_llm
-from prompts import SUMMARY_PROMPT, LOGIC_QUESTION_GEN_PROMPT, EVALUATE_RESPONSE_PROMPT,ENHANCED_QA_PROMPT
+from highlighting import highlight_text as _highlight_phrases, merge_spans
+from grounding import QuoteIndex, spans_within
+from dedup import find_near_duplicates, duplicate_chunks_total, embed_seconds_saved_total
+from memory import BoundedConversationMemory
+from metrics import span, traced, traced_stream, current_request, record_tokens, question_retries_total
+from profiling import profiled
+import footprint
+from index_registry import document_hash
+import document_store
+from rate_limiter import (
+    limiter,
+    RateLimitExceeded,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_CHALLENGE,
+    PRIORITY_SUMMARY,
+    PRIORITY_BACKGROUND
+)
+from singleflight import llm_flights, llm_call_key
+from model_router import router
+from answer_cache import answer_cache, normalize_question
+import usage
+from usage import TokenBudgetExceeded
+from prompts import SUMMARY_PROMPT, LOGIC_QUESTION_GEN_PROMPT, EVALUATE_RESPONSE_PROMPT,ENHANCED_QA_PROMPT, CONVERSATION_SUMMARY_PROMPT, MULTI_QUERY_PROMPT, FOLLOWUP_PROMPT
 
-# Initialize embedding model
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Embedding model, created on first use
+_embeddings = None
 
-# Enhanced prompt for answer highlighting
+def get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        # EZ_EMBEDDING_BACKEND selects PyTorch (hf) or ONNX Runtime (onnx, onnx-int8)
+        from embedding_backends import create_embeddings
+        _embeddings = batch_queries(create_embeddings())
+    return _embeddings
 
+# Queries from concurrent sessions are embedded together; EZ_EMBED_BATCH_WAIT_MS=0 disables
+def batch_queries(embedding_model, max_wait_ms=None, max_batch=None):
+    max_wait_ms = float(os.getenv("EZ_EMBED_BATCH_WAIT_MS", "5") if max_wait_ms is None else max_wait_ms)
+    max_batch = int(os.getenv("EZ_EMBED_MAX_BATCH", "32") if max_batch is None else max_batch)
+    if max_wait_ms <= 0:
+        return embedding_model
+    from embedding_batcher import MicroBatchingEmbeddings
+    return MicroBatchingEmbeddings(embedding_model, max_wait_ms=max_wait_ms, max_batch=max_batch)
 
-# 1. Create Vector Store with metadata
-def prepare_vector_store(raw_text):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500, 
-        chunk_overlap=50,
-        separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+def set_embeddings(embedding_model):
+    """Replace the embedding model, e.g. with a deterministic fake in benchmarks"""
+    global _embeddings
+    _embeddings = embedding_model
+
+# Rough token estimate: ~4 characters per token plus room for the completion
+def estimate_tokens(prompt_text, completion_tokens=512):
+    return len(prompt_text) // 4 + completion_tokens
+
+# Build an LLMChain for a prompt template string
+def make_chain(llm, template):
+    from langchain.chains import LLMChain
+    from langchain.prompts import PromptTemplate
+    return LLMChain(llm=llm, prompt=PromptTemplate.from_template(template))
+
+# Every LLM call goes through the shared rate limiter so 429s back off
+# instead of failing, and interactive calls are served before background ones.
+# Identical calls of the same priority already in flight (e.g. a class
+# uploading the same PDF) share one upstream request. Tokens are accounted under the task as the feature;
+# an exhausted token budget raises TokenBudgetExceeded before any call.
+def run_chain(chain, priority, task="default", **inputs):
+    usage.ledger.check()
+    rendered_prompt = chain.prompt.format(**inputs)
+    estimated_tokens = estimate_tokens(rendered_prompt)
+    model = getattr(chain.llm, "model_name", None) or type(chain.llm).__name__
+    
+    # Every attempt (including rate-limited ones) feeds the model router
+    def call():
+        start = time.perf_counter()
+        try:
+            with usage.scope(feature=task):
+                response = chain.run(**inputs)
+        except Exception:
+            router.observe(model, task, len(rendered_prompt), time.perf_counter() - start, ok=False)
+            raise
+        router.observe(model, task, len(rendered_prompt), time.perf_counter() - start)
+        return response
+    
+    return llm_flights.do(
+        llm_call_key(chain.llm, rendered_prompt, priority),
+        lambda: limiter.call(call, priority, estimated_tokens)
     )
+
+# Length of the prompt as sent; the router chooses a model by the same size
+# run_chain records its latency under, so both use one size bucket
+def prompt_chars(template, **inputs):
+    return len(template.format(**inputs))
+
+# Run a prompt on the routed model; in cascade mode start on the fastest model
+# and escalate while validate(response) fails. Returns the last response.
+def run_cascade(template, priority, task, validate, temperature=0.0, **inputs):
+    models = router.cascade(task, prompt_chars(template, **inputs))
+    for i, model in enumerate(models):
+        chain = make_chain(get_groq_llm(model=model, temperature=temperature, task=task), template)
+        response = run_chain(chain, priority, task=task, **inputs)
+        if i == len(models) - 1 or validate(response):
+            return response
+        router.escalated(task, model, models[i + 1])
+
+# 1. Create Vector Store with metadata
+@traced("ingest")
+@profiled("ingest")
+def prepare_vector_store(raw_text, page_starts=None):
+    from langchain.docstore.document import Document
+    from compact_store import build_vector_store
     
-    chunks = text_splitter.split_text(raw_text)
-    docs = []
+    with span("split"), footprint.measure("split"):
+        chunk_spans = split_text(raw_text, page_starts)
+    
+    # Index the whole document so quotes can be grounded to exact spans,
+    # including quotes that cross chunk boundaries
+    with span("ground_index"), footprint.measure("ground_index"):
+        quote_index = QuoteIndex(raw_text, page_starts)
     
-    for i, chunk in enumerate(chunks):
+    docs = []
+    for i, (start_char, end_char, section, section_type) in enumerate(chunk_spans):
+        content = raw_text[start_char:end_char]
         # Add metadata to each chunk for better tracking
         doc = Document(
-            page_content=chunk,
+            page_content=content,
             metadata={
                 "chunk_id": i,
-                "chunk_length": len(chunk),
-                "start_char": raw_text.find(chunk),
-                "end_char": raw_text.find(chunk) + len(chunk)
+                "chunk_length": len(content),
+                "start_char": start_char,
+                "end_char": end_char,
+                "page": quote_index.page_of(start_char),
+                "section": section,
+                "section_type": section_type
             }
         )
         docs.append(doc)
     
-    vector_store = FAISS.from_documents(docs, embeddings)
+    # Collapse repeated headers, notices and near-identical paragraphs into
+    # one canonical chunk that remembers every place it occurs
+    with span("dedup"), footprint.measure("dedup"):
+        docs = collapse_duplicates(docs)
+    duplicates = sum(len(doc.metadata["occurrences"]) - 1 for doc in docs)
+    
+    embeddings = get_embeddings()
+    texts = [doc.page_content for doc in docs]
+    embed_start = time.perf_counter()
+    with span("embed"), footprint.measure("embed"):
+        vectors = embeddings.embed_documents(texts)
+    if duplicates:
+        # Estimated from this document's own per-chunk embedding time
+        seconds_saved = (time.perf_counter() - embed_start) / max(1, len(texts)) * duplicates
+        duplicate_chunks_total.inc(duplicates)
+        embed_seconds_saved_total.inc(seconds_saved)
+        record = current_request()
+        if record is not None:
+            record["duplicate_chunks"] = duplicates
+            record["embed_seconds_saved"] = round(seconds_saved, 6)
+        print(f"🧹 Skipped {duplicates} near-duplicate chunks (~{seconds_saved:.2f}s of embedding)")
+    with span("index"), footprint.measure("index"):
+        # EZ_VECTOR_STORAGE / EZ_COMPACT_DOCSTORE pick the in-memory layout
+        vector_store = build_vector_store(
+            texts,
+            vectors,
+            [doc.metadata for doc in docs],
+            embeddings
+        )
+    vector_store.quote_index = quote_index
+    return vector_store
+
+# Keep the first chunk of each near-duplicate group, with all occurrence offsets
+def collapse_duplicates(docs):
+    canonical = find_near_duplicates([doc.page_content for doc in docs])
+    occurrences = {}
+    for doc, position in zip(docs, canonical):
+        occurrences.setdefault(position, []).append([doc.metadata["start_char"], doc.metadata["end_char"]])
+    
+    kept = []
+    for position, doc in enumerate(docs):
+        if canonical[position] == position:
+            doc.metadata["occurrences"] = occurrences[position]
+            doc.metadata["chunk_id"] = len(kept)
+            kept.append(doc)
+    return kept
+
+# Split into (start, end, section, section_type) chunks. EZ_CHUNKING=structured
+# (default) follows headings and drops running headers/footers; "recursive"
+# keeps the original fixed-size splitter.
+def split_text(raw_text, page_starts=None):
+    if os.getenv("EZ_CHUNKING", "structured") == "structured":
+        from chunking import split_structured
+        return split_structured(raw_text, page_starts)
+    
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500, 
+        chunk_overlap=50,
+        separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
+        add_start_index=True
+    )
+    return [
+        (chunk.metadata["start_index"], chunk.metadata["start_index"] + len(chunk.page_content), "", "body")
+        for chunk in text_splitter.create_documents([raw_text])
+    ]
+
+# Load a persisted index for this document, or build and persist one
+def load_or_prepare_vector_store(raw_text, page_starts=None, doc_hash=None):
+    doc_hash = doc_hash or document_hash(raw_text)
+    try:
+        vector_store = document_store.load_index(doc_hash, get_embeddings())
+        if vector_store is not None:
+            return vector_store
+    except Exception as e:
+        print(f"⚠️ Could not load stored index {doc_hash[:12]}, rebuilding: {e}")
+    
+    vector_store = prepare_vector_store(raw_text, page_starts)
+    try:
+        document_store.save_index(doc_hash, vector_store)
+    except Exception as e:
+        print(f"⚠️ Could not persist index {doc_hash[:12]}: {e}")
     return vector_store
 
 # 2. Generate Auto Summary
-def summarize_document(content):
+@traced("summary")
+@profiled("summary")
+def summarize_document(content, level=None):
     content = content[:5000]
-    llm = get_groq_llm()
-    chain = LLMChain(llm=llm, prompt=PromptTemplate.from_template(SUMMARY_PROMPT))
-    return chain.run(content=content)
+    # A nearly spent token budget summarizes a shorter opening
+    if (level or usage.ledger.level()) == "low":
+        usage.ledger.degraded("summary", "low")
+        content = content[:2000]
+    llm = get_groq_llm(task="summary", input_chars=prompt_chars(SUMMARY_PROMPT, content=content))
+    chain = make_chain(llm, SUMMARY_PROMPT)
+    with span("llm"):
+        return run_chain(chain, PRIORITY_SUMMARY, task="summary", content=content)
+
+# Summaries are stored by document hash so reruns and workers reuse them.
+# Over budget, the document's opening sentences stand in. Neither that nor a
+# shortened summary from a low budget is stored, so the full one is made
+# once the budget recovers.
+def get_document_summary(content, doc_hash=None):
+    doc_hash = doc_hash or document_hash(content)
+    summary = document_store.load_summary(doc_hash)
+    if summary is None:
+        level = usage.ledger.level()
+        try:
+            summary = summarize_document(content, level)
+        except TokenBudgetExceeded:
+            usage.ledger.degraded("summary", "exhausted")
+            from extractive import split_sentences
+            opening = " ".join(split_sentences(content[:5000])[:5])
+            return f"(Token budget reached; showing the document's opening instead.)\n\n{opening}"
+        if level == "ok":
+            document_store.save_summary(doc_hash, summary)
+    return summary
 
 # 3. Enhanced QA Chain with Answer Highlighting
-def qa_chain_with_highlighting(vector_store, query, conversation_memory=None):
+@traced("ask")
+@profiled("ask")
+def qa_chain_with_highlighting(vector_store, query, conversation_memory=None, relevant_docs=None,
+                               priority=PRIORITY_INTERACTIVE):
     """Enhanced QA with answer highlighting and optional memory"""
-    retriever = vector_store.as_retriever(search_kwargs={"k": 5})  # Get more context
-    llm = get_groq_llm()
+    relevant_docs, context = build_qa_context(vector_store, query, conversation_memory, relevant_docs)
+    result = try_extractive_answer(vector_store, query, relevant_docs)
+    if result is not None:
+        return result
+    
+    # Generate answer; an empty ANSWER section escalates in cascade mode
+    try:
+        with span("llm"):
+            response = run_cascade(
+                ENHANCED_QA_PROMPT,
+                priority,
+                "qa",
+                lambda text: bool(parse_answer_response(text)[0]),
+                context=context,
+                question=query
+            )
+    except TokenBudgetExceeded:
+        return budget_fallback_answer(vector_store, query, relevant_docs)
     
+    return build_answer_result(vector_store, relevant_docs, response)
+
+# Streaming variant: yields answer text as it arrives, then the full result
+@traced_stream("ask_stream")
+def stream_answer_with_highlighting(vector_store, query, conversation_memory=None):
+    """Yield ("token", text) pieces and finally ("result", result_dict)"""
+    relevant_docs, context = build_qa_context(vector_store, query, conversation_memory)
+    result = try_extractive_answer(vector_store, query, relevant_docs)
+    if result is None and usage.ledger.level() == "exhausted":
+        result = budget_fallback_answer(vector_store, query, relevant_docs)
+    if result is not None:
+        yield "token", result["answer"]
+        yield "result", result
+        return
+    
+    prompt_text = ENHANCED_QA_PROMPT.format(context=context, question=query)
+    llm = get_groq_llm(task="qa", input_chars=len(prompt_text))
+    model = getattr(llm, "model_name", None) or type(llm).__name__
+    
+    pieces = []
+    with span("llm"), limiter.slot(PRIORITY_INTERACTIVE, estimate_tokens(prompt_text)):
+        start = time.perf_counter()
+        try:
+            for chunk in llm.stream(prompt_text):
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    pieces.append(text)
+                    yield "token", text
+        except Exception:
+            router.observe(model, "qa", len(prompt_text), time.perf_counter() - start, ok=False)
+            raise
+        router.observe(model, "qa", len(prompt_text), time.perf_counter() - start)
+    
+    # Streamed responses don't report token usage; account an estimate instead
+    prompt_tokens = estimate_tokens(prompt_text, completion_tokens=0)
+    completion_tokens = estimate_tokens("".join(pieces), completion_tokens=0)
+    record_tokens(prompt_tokens, completion_tokens)
+    usage.ledger.record(prompt_tokens, completion_tokens, model, feature="qa")
+    
+    yield "result", build_answer_result(vector_store, relevant_docs, "".join(pieces))
+
+# Rewrites from a fast LLM call; retrieval carries on with local rewrites if it fails
+def expand_query_with_llm(query, count=3):
+    try:
+        inputs = {"question": query, "count": count}
+        llm = get_groq_llm(task="expand", input_chars=prompt_chars(MULTI_QUERY_PROMPT, **inputs))
+        response = run_chain(make_chain(llm, MULTI_QUERY_PROMPT), PRIORITY_INTERACTIVE, task="expand", **inputs)
+    except Exception as e:
+        print(f"⚠️ Query expansion failed: {e}")
+        return []
+    rewrites = [re.sub(r"^\s*(?:\d+[.)]|[-*•])\s*", "", line).strip() for line in response.splitlines()]
+    return [rewrite for rewrite in rewrites if rewrite][:count]
+
+# EZ_RETRIEVAL: "single" (one similarity search), "multi" (local query rewrites,
+# one batched embedding and FAISS search, RRF fusion) or "multi-llm" (adds LLM rewrites)
+def retrieve_documents(vector_store, query, k=5, mode=None):
+    mode = mode or os.getenv("EZ_RETRIEVAL", "single")
+    if mode == "single":
+        return vector_store.as_retriever(search_kwargs={"k": k}).get_relevant_documents(query)
+    
+    from retrieval import expand_query, multi_query_search, MAX_QUERIES
+    queries = expand_query(query)
+    # LLM rewrites are an extra call the token budget can go without
+    if mode == "multi-llm" and usage.ledger.level() == "ok":
+        with span("expand"):
+            for rewrite in expand_query_with_llm(query):
+                if rewrite.lower() not in {q.lower() for q in queries}:
+                    queries.append(rewrite)
+    return multi_query_search(vector_store, queries[:MAX_QUERIES + 3], k=k)
+
+def build_qa_context(vector_store, query, conversation_memory=None, relevant_docs=None):
+    """Retrieve relevant chunks (unless already prefetched) and assemble the prompt context"""
     # Get relevant documents
-    relevant_docs = retriever.get_relevant_documents(query)
-    
-    # Combine context from all relevant documents
-    context = "\n\n".join([doc.page_content for doc in relevant_docs])
-    
-    # Create enhanced prompt
-    prompt = PromptTemplate.from_template(ENHANCED_QA_PROMPT)
-    
-    # Add conversation memory if provided
-    if conversation_memory:
-        # Get conversation history
-        history = conversation_memory.chat_memory.messages
-        if history:
-            conversation_context = "\n".join([
-                f"Previous Q: {msg.content}" if msg.type == "human" else f"Previous A: {msg.content}"
-                for msg in history[-4:]  # Last 2 Q&A pairs
-            ])
-            context = f"Previous conversation:\n{conversation_context}\n\nCurrent context:\n{context}"
-    
-    # Generate answer
-    chain = LLMChain(llm=llm, prompt=prompt)
-    response = chain.run(context=context, question=query)
-    
-    # Parse response to separate answer and quotes
+    if relevant_docs is None:
+        # Fewer chunks keep the prompt small once the token budget runs low
+        k = 5
+        level = usage.ledger.level()
+        if level != "ok":
+            usage.ledger.degraded("qa", level)
+            k = 3
+        with span("retrieve"):
+            relevant_docs = retrieve_documents(vector_store, query, k=k)  # Get more context
+            # Bibliography chunks go after body text (stable sort keeps similarity order)
+            relevant_docs.sort(key=lambda doc: doc.metadata.get("section_type") == "references")
+    
+    with span("prompt"):
+        # Combine context from all relevant documents
+        context = "\n\n".join([doc.page_content for doc in relevant_docs])
+        
+        # Add conversation memory if provided
+        if conversation_memory:
+            # Rolling summary plus the last Q&A pairs kept verbatim
+            conversation_context = conversation_memory.get_context()
+            if conversation_context:
+                context = f"Previous conversation:\n{conversation_context}\n\nCurrent context:\n{context}"
+    
+    return relevant_docs, context
+
+# Lookup questions ("what dataset was used?") answered from the best matching
+# sentences when they are similar enough to the question; None means ask the LLM.
+# EZ_ANSWER_MODE=auto enables this, "llm" (default) always calls the LLM.
+# force=True answers any question with the best sentences found.
+def try_extractive_answer(vector_store, query, relevant_docs, mode=None, force=False):
+    mode = mode or os.getenv("EZ_ANSWER_MODE", "llm")
+    if mode != "auto" and not force:
+        return None
+    from extractive import is_lookup_question, best_sentences, THRESHOLD
+    if not relevant_docs or not (force or is_lookup_question(query)):
+        return None
+    
+    threshold = -1.0 if force else float(os.getenv("EZ_EXTRACTIVE_THRESHOLD", THRESHOLD))
+    embeddings = getattr(vector_store, "embeddings", None) or get_embeddings()
+    with span("extractive"):
+        sentences, confidence = best_sentences(embeddings, query, relevant_docs, threshold)
+    record = current_request()
+    if record is not None:
+        record["answer_mode"] = "extractive" if sentences else "llm"
+        record["extractive_confidence"] = round(confidence, 4)
+    if not sentences:
+        return None
+    return assemble_answer_result(vector_store, relevant_docs, " ".join(sentences), sentences)
+
+# With the token budget used up, answer from the closest sentences instead of failing
+def budget_fallback_answer(vector_store, query, relevant_docs):
+    usage.ledger.degraded("qa", "exhausted")
+    result = try_extractive_answer(vector_store, query, relevant_docs, force=True)
+    if result is None:
+        result = assemble_answer_result(vector_store, relevant_docs, "", [])
+    result["answer"] = f"(Token budget reached; closest passages from the document.) {result['answer']}".strip()
+    return result
+
+def build_answer_result(vector_store, relevant_docs, response):
+    """Parse an LLM response and ground its quotes in the retrieved chunks"""
+    with span("parse"):
+        main_answer, supporting_quotes = parse_answer_response(response)
+    return assemble_answer_result(vector_store, relevant_docs, main_answer, supporting_quotes)
+
+def assemble_answer_result(vector_store, relevant_docs, main_answer, supporting_quotes):
+    """Result dict shared by the LLM and extractive answer paths"""
+    with span("highlight"):
+        highlighted_sources, quote_index, quote_spans = ground_sources(
+            vector_store, relevant_docs, supporting_quotes
+        )
+    
+    return {
+        "answer": main_answer,
+        "supporting_quotes": supporting_quotes,
+        "highlighted_sources": highlighted_sources[:3],  # Top 3 most relevant
+        "all_sources": [doc.page_content for doc in relevant_docs],
+        "quote_locations": [
+            {
+                "quote": quote,
+                "start": start,
+                "end": end,
+                "page": quote_index.page_of(start)
+            }
+            for quote, spans in quote_spans.items()
+            for start, end in spans
+        ]
+    }
+
+def parse_answer_response(response):
+    """Split an ANSWER/SUPPORTING_QUOTES response into answer and quotes"""
     answer_parts = response.split("SUPPORTING_QUOTES:")
     main_answer = answer_parts[0].replace("ANSWER:", "").strip()
     
@@ -93,6 +458,13 @@ def qa_chain_with_highlighting(vector_store, query, conversation_memory=None):
             line = line.strip()
             if line and (line.startswith('"') or '"' in line):
                 supporting_quotes.append(line.strip('"'))
+    return main_answer, supporting_quotes
+
+def ground_sources(vector_store, relevant_docs, supporting_quotes):
+    """Score and highlight retrieved chunks against the supporting quotes"""
+    # Ground each quote to exact spans in the full document when possible
+    quote_index = getattr(vector_store, "quote_index", None)
+    quote_spans = quote_index.locate_all(supporting_quotes) if quote_index else {}
     
     # Find and highlight source snippets
     highlighted_sources = []
@@ -100,92 +472,169 @@ def qa_chain_with_highlighting(vector_store, query, conversation_memory=None):
         snippet = doc.page_content
         metadata = doc.metadata
         
-        # Try to find overlapping content with supporting quotes
         relevance_score = 0
-        for quote in supporting_quotes:
-            if quote.lower() in snippet.lower():
-                relevance_score += 1
+        highlight_spans = []
+        if quote_index and "start_char" in metadata:
+            # Count quotes whose grounded spans overlap this chunk
+            for spans in quote_spans.values():
+                chunk_spans = spans_within(spans, metadata["start_char"], metadata["end_char"])
+                if chunk_spans:
+                    relevance_score += 1
+                    highlight_spans.extend(chunk_spans)
+        else:
+            # Try to find overlapping content with supporting quotes
+            for quote in supporting_quotes:
+                if quote.lower() in snippet.lower():
+                    relevance_score += 1
         
         highlighted_sources.append({
             "content": snippet,
             "metadata": metadata,
             "relevance_score": relevance_score,
-            "highlighted_parts": supporting_quotes
+            "highlighted_parts": supporting_quotes,
+            "highlight_spans": merge_spans(highlight_spans)
         })
     
     # Sort by relevance
     highlighted_sources.sort(key=lambda x: x["relevance_score"], reverse=True)
-    
-    return {
-        "answer": main_answer,
-        "supporting_quotes": supporting_quotes,
-        "highlighted_sources": highlighted_sources[:3],  # Top 3 most relevant
-        "all_sources": [doc.page_content for doc in relevant_docs]
-    }
+    return highlighted_sources, quote_index, quote_spans
 
 # 4. Memory-aware Conversational Chain
+def summarize_conversation(previous_summary, turns):
+    """Fold older Q&A turns into the running conversation summary"""
+    inputs = {
+        "summary": previous_summary or "(none)",
+        "exchanges": "\n".join(f"Q: {q}\nA: {a}" for q, a in turns),
+    }
+    llm = get_groq_llm(task="conversation_summary", input_chars=prompt_chars(CONVERSATION_SUMMARY_PROMPT, **inputs))
+    chain = make_chain(llm, CONVERSATION_SUMMARY_PROMPT)
+    return run_chain(chain, PRIORITY_BACKGROUND, task="conversation_summary", **inputs)
+
+# Predict likely follow-up questions for speculative prefetching
+def predict_follow_up_questions(question, answer, document_summary=None, count=3):
+    inputs = {
+        "summary": (document_summary or "(not available)")[:1500],
+        "question": question,
+        "answer": answer[:1500],
+        "count": count,
+    }
+    llm = get_groq_llm(task="followups", input_chars=prompt_chars(FOLLOWUP_PROMPT, **inputs))
+    chain = make_chain(llm, FOLLOWUP_PROMPT)
+    response = run_chain(chain, PRIORITY_BACKGROUND, task="followups", **inputs)
+    questions = [re.sub(r"^\s*(?:\d+[.)]|[-*•])\s*", "", line).strip() for line in response.splitlines()]
+    return [q for q in questions if q.endswith("?")][:count]
+
 class EnhancedConversationalChain:
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, max_turns=2, document_summary=None):
         self.vector_store = vector_store
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history", 
-            return_messages=True,
-            output_key="answer"
+        # Bounded memory: recent turns verbatim, older ones summarized
+        # in the background
+        self.memory = BoundedConversationMemory(
+            max_turns=max_turns,
+            summarizer=summarize_conversation
         )
-        self.llm = get_groq_llm()
+        self.document_summary = document_summary
+        # Bumped on clear so cached answers from an earlier conversation never match
+        self._epoch = 0
         
-    def ask_question(self, question):
-        """Ask a question with memory context"""
+        # EZ_PREFETCH: "off" (default), "retrieval" (pre-run retrieval for
+        # predicted follow-ups) or "answer" (also pre-generate their answers)
+        self.prefetcher = None
+        prefetch_mode = os.getenv("EZ_PREFETCH", "off")
+        if prefetch_mode != "off":
+            from prefetch import FollowUpPrefetcher
+            self.prefetcher = FollowUpPrefetcher(
+                predict=lambda question, answer: predict_follow_up_questions(question, answer, self.document_summary),
+                prefetch_retrieval=self._prefetch_retrieval,
+                prefetch_answer=self._prefetch_answer if prefetch_mode == "answer" else None,
+                # Prompt plus about five retrieved chunks
+                estimate_tokens=lambda question: estimate_tokens(ENHANCED_QA_PROMPT + question) + 1250,
+                token_budget=int(os.getenv("EZ_PREFETCH_TOKEN_BUDGET", "6000"))
+            )
+    
+    def _document_key(self):
+        return getattr(self.vector_store, "doc_hash", None) or id(self.vector_store)
+    
+    def _retrieval_key(self, question):
+        return ("retrieval", self._document_key(), normalize_question(question))
+    
+    def _answer_key(self, question):
+        # Answers depend on the conversation so far
+        return ("answer", self._document_key(), id(self), self._epoch, self.memory.turn_count,
+                normalize_question(question))
+    
+    def _prefetch_retrieval(self, question):
+        key = self._retrieval_key(question)
+        if key not in answer_cache:
+            relevant_docs, _ = build_qa_context(self.vector_store, question)
+            answer_cache.put(key, relevant_docs)
+    
+    def _prefetch_answer(self, question, cancelled):
+        key = self._answer_key(question)
+        if key in answer_cache or cancelled.is_set():
+            return
+        relevant_docs = answer_cache.get(self._retrieval_key(question), kind="prefetch")
         result = qa_chain_with_highlighting(
-            self.vector_store, 
-            question, 
-            self.memory
+            self.vector_store, question, self.memory, relevant_docs, priority=PRIORITY_BACKGROUND
         )
+        answer_cache.put(key, result)
+        
+    def ask_question(self, question):
+        """Ask a question with memory context"""
+        result = relevant_docs = None
+        if self.prefetcher is not None:
+            # The user is back; stop speculative work and use whatever is ready
+            self.prefetcher.cancel()
+            result = answer_cache.get(self._answer_key(question), kind="answer")
+            if result is None:
+                relevant_docs = answer_cache.get(self._retrieval_key(question), kind="retrieval")
+            self.prefetcher.record_lookup(result is not None or relevant_docs is not None)
+        
+        if result is None:
+            result = qa_chain_with_highlighting(
+                self.vector_store, 
+                question, 
+                self.memory,
+                relevant_docs
+            )
         
         # Save to memory
-        self.memory.save_context(
-            {"input": question},
-            {"answer": result["answer"]}
-        )
+        self.memory.add_turn(question, result["answer"])
         
+        # Speculative calls are the first thing a tight token budget drops
+        if self.prefetcher is not None and usage.ledger.level() == "ok":
+            self.prefetcher.start(question, result["answer"])
         return result
     
+    def restore_turns(self, turns):
+        """Reload (question, answer) pairs, e.g. the last turns of a stored conversation"""
+        for question, answer in turns:
+            self.memory.add_turn(question, answer)
+    
+    def suggested_questions(self):
+        """Follow-up questions predicted (and prefetched) for the last answer"""
+        return list(self.prefetcher.predictions) if self.prefetcher is not None else []
+    
     def get_conversation_history(self):
-        """Get formatted conversation history"""
-        history = self.memory.chat_memory.messages
-        formatted_history = []
-        
-        for i in range(0, len(history), 2):
-            if i + 1 < len(history):
-                q = history[i].content
-                a = history[i + 1].content
-                formatted_history.append({"question": q, "answer": a})
-        
-        return formatted_history
+        """Get formatted conversation history still held verbatim in memory"""
+        return self.memory.recent_turns()
+    
+    def memory_bytes(self):
+        """Approximate bytes held by this session's conversation memory"""
+        return self.memory.bytes_held()
     
     def clear_memory(self):
         """Clear conversation memory"""
+        if self.prefetcher is not None:
+            self.prefetcher.cancel()
+            self.prefetcher.predictions = []
+        self._epoch += 1
         self.memory.clear()
 
 # 5. Text highlighting utility
 def highlight_text(text, phrases_to_highlight):
     """Highlight specific phrases in text"""
-    if not phrases_to_highlight:
-        return text
-    
-    highlighted_text = text
-    for phrase in phrases_to_highlight:
-        if phrase and phrase.strip():
-            # Use case-insensitive matching
-            pattern = re.escape(phrase.strip())
-            highlighted_text = re.sub(
-                pattern, 
-                f"**{phrase.strip()}**", 
-                highlighted_text, 
-                flags=re.IGNORECASE
-            )
-    
-    return highlighted_text
+    return _highlight_phrases(text, phrases_to_highlight)
 
 # 6. Legacy QA function for backward compatibility
 def qa_chain(vector_store, query):
@@ -290,36 +739,50 @@ def generate_fallback_questions(content):
     ]
 
 # 7. Improved Challenge Me: Logic-Based Questions
+@traced("questions")
+@profiled("questions")
 def generate_logic_questions(content):
     """Generate logic-based questions with improved error handling"""
     
-    # Limit content to avoid token limits
+    # Limit content to avoid token limits; less once the token budget runs low
     content = content[:3000]
-    
-    # Use lower temperature for more consistent output
-    llm = get_groq_llm(temperature=0.1)
-    
-    # Use improved prompt
-    prompt = PromptTemplate.from_template(LOGIC_QUESTION_GEN_PROMPT)
-    chain = LLMChain(llm=llm, prompt=prompt)
+    if usage.ledger.level() == "low":
+        usage.ledger.degraded("questions", "low")
+        content = content[:1500]
+    
+    # In cascade mode a retry after failed validation moves to the next model;
+    # errors and rate limits retry the same one
+    models = router.cascade("questions", prompt_chars(LOGIC_QUESTION_GEN_PROMPT, context=content))
+    model_index = 0
 
     max_attempts = 3
     for attempt in range(max_attempts):
+        invalid = False
         try:
             print(f"🔄 Attempt {attempt + 1} to generate questions...")
+            if attempt > 0:
+                question_retries_total.inc()
+            
+            # Use lower temperature for more consistent output
+            llm = get_groq_llm(model=models[model_index], temperature=0.1, task="questions")
+            chain = make_chain(llm, LOGIC_QUESTION_GEN_PROMPT)
             
             # Generate response
-            response = chain.run(context=content)
+            with span("llm"):
+                response = run_chain(chain, PRIORITY_CHALLENGE, task="questions", context=content)
             print(f"📝 Raw LLM Response:\n{response}")
 
             # Clean the response
-            cleaned_json = clean_json_response(response)
+            with span("parse"):
+                cleaned_json = clean_json_response(response)
             if not cleaned_json:
                 print("❌ Failed to extract JSON from response")
+                invalid = True
                 continue
 
             # Parse JSON
-            questions = json.loads(cleaned_json)
+            with span("parse"):
+                questions = json.loads(cleaned_json)
             print(f"✅ Parsed {len(questions)} questions")
 
             # Validate questions
@@ -344,25 +807,88 @@ def generate_logic_questions(content):
                     return valid_questions
                 else:
                     print(f"⚠️ Only {len(valid_questions)} valid questions generated, need at least 2")
+            invalid = True
 
+        except RateLimitExceeded as e:
+            # The limiter already backed off and retried; don't hammer Groq further
+            print(f"❌ Rate limited on attempt {attempt + 1}: {e}")
+            break
+        except TokenBudgetExceeded as e:
+            usage.ledger.degraded("questions", "exhausted")
+            print(f"❌ {e}")
+            break
         except json.JSONDecodeError as e:
             print(f"❌ JSON parsing error on attempt {attempt + 1}: {e}")
             if cleaned_json:
                 print(f"Problematic JSON: {cleaned_json[:200]}...")
+            invalid = True
         except Exception as e:
             print(f"❌ Unexpected error on attempt {attempt + 1}: {e}")
+        finally:
+            if invalid and model_index + 1 < len(models):
+                router.escalated("questions", models[model_index], models[model_index + 1])
+                model_index += 1
     
     # If all attempts fail, use fallback
     print("🔄 All attempts failed, using fallback questions based on document content")
     return generate_fallback_questions(content)
 
+# Paragraphs sharing the most words with text, kept in document order, up to max_chars
+def focus_context(document, text, max_chars):
+    if len(document) <= max_chars:
+        return document
+    words = set(re.findall(r"\w{3,}", text.lower()))
+    paragraphs = [p for p in re.split(r"\n\s*\n", document) if p.strip()]
+    ranked = sorted(
+        range(len(paragraphs)),
+        key=lambda i: len(words & set(re.findall(r"\w{3,}", paragraphs[i].lower()))),
+        reverse=True
+    )
+    chosen, used = [], 0
+    for i in ranked:
+        if used + len(paragraphs[i]) > max_chars:
+            continue
+        chosen.append(i)
+        used += len(paragraphs[i]) + 2
+    if not chosen:
+        return document[:max_chars]
+    return "\n\n".join(paragraphs[i] for i in sorted(chosen))
+
 # 8. Evaluate user's freeform answer to challenge question
+# The whole document is sent unless EZ_EVALUATE_CONTEXT_CHARS caps it or the
+# token budget is low; then only the passages relevant to the question and
+# answer go (1500 characters at most on a low budget)
+@traced("evaluate")
 def evaluate_user_response(document, question, response):
-    llm = get_groq_llm()
-    chain = LLMChain(llm=llm, prompt=PromptTemplate.from_template(EVALUATE_RESPONSE_PROMPT))
-    return chain.run(context=document, question=question, response=response)
+    configured = os.getenv("EZ_EVALUATE_CONTEXT_CHARS")
+    max_chars = int(configured) if configured else None
+    level = usage.ledger.level()
+    if level == "exhausted":
+        usage.ledger.degraded("evaluate", level)
+        return "Evaluation is unavailable: the token budget for this document or session is used up."
+    if level == "low":
+        usage.ledger.degraded("evaluate", level)
+        max_chars = min(max_chars or 1500, 1500)
+    context = document
+    if max_chars is not None:
+        with span("prompt"):
+            context = focus_context(document, f"{question}\n{response}", max_chars)
+    llm = get_groq_llm(
+        task="evaluate",
+        input_chars=prompt_chars(EVALUATE_RESPONSE_PROMPT, context=context, question=question, response=response)
+    )
+    chain = make_chain(llm, EVALUATE_RESPONSE_PROMPT)
+    with span("llm"):
+        return run_chain(
+            chain,
+            PRIORITY_CHALLENGE,
+            task="evaluate",
+            context=context,
+            question=question,
+            response=response
+        )
 
 # 9. Legacy function for backward compatibility
-def get_conversational_chain(vector_store: FAISS):
+def get_conversational_chain(vector_store):
     """Legacy function - use EnhancedConversationalChain instead"""
     return EnhancedConversationalChain(vector_store)
\ No newline at end of file
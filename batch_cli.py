@@ -0,0 +1,157 @@
+"""Headless batch processing of documents.
+
+Extracts, indexes and summarizes PDF/TXT files in parallel worker
+processes and writes the results to the persistent stores used by the
+app, so Streamlit sessions open pre-processed documents instantly.
+Finished documents are skipped on the next run, so an interrupted job
+can simply be started again.
+
+    python batch_cli.py papers/ extra.pdf --workers 4 --llm-concurrency 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+# Set in each worker process by _init_worker; unbounded when process_document runs elsewhere
+_llm_semaphore = nullcontext()
+
+
+def discover_files(paths, recursive=False):
+    """Expand the given files and directories into a sorted list of documents"""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for root, _, names in os.walk(path):
+                    found.update(os.path.join(root, n) for n in names if n.lower().endswith(SUPPORTED_EXTENSIONS))
+            else:
+                found.update(
+                    os.path.join(path, n) for n in os.listdir(path)
+                    if n.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(os.path.join(path, n))
+                )
+        elif os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS):
+            found.add(path)
+        else:
+            print(f"⚠️ Skipping {path}: not a PDF/TXT file or directory", file=sys.stderr)
+    return sorted(found)
+
+
+def read_document(path):
+    """Return (text, page_starts) for a PDF or TXT file"""
+    from utils import extract_text_and_pages_from_pdf, extract_text_from_txt
+
+    with open(path, "rb") as f:
+        if path.lower().endswith(".pdf"):
+            return extract_text_and_pages_from_pdf(f)
+        return extract_text_from_txt(f), None
+
+
+def _init_worker(llm_semaphore, store_dir):
+    global _llm_semaphore
+    _llm_semaphore = llm_semaphore
+    import document_store
+    document_store.STORE_DIR = store_dir
+
+
+def process_document(path, summarize=True, force=False):
+    """Extract, index and summarize one document, skipping finished work"""
+    import backend
+    import document_store
+    from index_registry import document_hash
+
+    start = time.time()
+    result = {"path": path, "status": "ok"}
+    try:
+        text, page_starts = read_document(path)
+        if not text.strip():
+            return {**result, "status": "empty"}
+        doc_hash = document_hash(text)
+        result["doc_hash"] = doc_hash
+
+        if force or not document_store.has_document(doc_hash):
+            document_store.save_document(doc_hash, text, page_starts)
+
+        indexed = document_store.has_index(doc_hash) and not force
+        summarized = (not summarize) or (document_store.load_summary(doc_hash) is not None and not force)
+        if indexed and summarized:
+            return {**result, "status": "skipped"}
+
+        if not indexed:
+            vector_store = backend.prepare_vector_store(text, page_starts)
+            document_store.save_index(doc_hash, vector_store)
+
+        if not summarized:
+            # Bound concurrent Groq calls across all worker processes
+            with _llm_semaphore:
+                summary = backend.summarize_document(text)
+            document_store.save_summary(doc_hash, summary)
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    result["seconds"] = round(time.time() - start, 2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or directories to process")
+    parser.add_argument("--recursive", action="store_true", help="Descend into subdirectories")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="Maximum simultaneous LLM calls")
+    parser.add_argument("--store-dir", default=None, help="Persistent store root (default: EZ_STORE_DIR or .ez_store)")
+    parser.add_argument("--no-summary", action="store_true", help="Only extract and index")
+    parser.add_argument("--force", action="store_true", help="Reprocess documents already in the store")
+    args = parser.parse_args(argv)
+
+    import document_store
+    store_dir = args.store_dir or document_store.STORE_DIR
+    files = discover_files(args.paths, args.recursive)
+    if not files:
+        print("❌ No PDF or TXT files found")
+        return 1
+    print(f"📚 Processing {len(files)} documents with {args.workers} workers into {store_dir}")
+
+    # Append-only log of every outcome, useful for nightly job reports
+    os.makedirs(store_dir, exist_ok=True)
+    log_path = os.path.join(store_dir, "batch_log.jsonl")
+
+    context = multiprocessing.get_context("spawn")
+    llm_semaphore = context.BoundedSemaphore(max(1, args.llm_concurrency))
+    counts = {"ok": 0, "skipped": 0, "empty": 0, "failed": 0}
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(llm_semaphore, store_dir)
+    )
+    try:
+        futures = [executor.submit(process_document, path, not args.no_summary, args.force) for path in files]
+        with open(log_path, "a") as log:
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                counts[result["status"]] += 1
+                log.write(json.dumps({**result, "finished_at": time.time()}) + "\n")
+                log.flush()
+                detail = f" ({result['error']})" if result.get("error") else ""
+                print(f"[{done}/{len(files)}] {result['status']:<7} {result['path']}{detail}")
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted; finished documents are saved and will be skipped on the next run")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    executor.shutdown()
+
+    print(
+        f"✅ Done: {counts['ok']} processed, {counts['skipped']} already done, "
+        f"{counts['empty']} empty, {counts['failed']} failed"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Compare embedding backends on throughput and retrieval agreement.
+
+Embeds the chunks of a synthetic document with each backend, then checks
+how often the top-k chunks retrieved for a set of queries match those of
+the PyTorch HuggingFace model. Run from the repository root:
+
+    python benchmarks/bench_embeddings.py --size 100KB --backends hf onnx onnx-int8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_backends import create_embeddings  # noqa: E402
+from synthetic import SIZES, make_document  # noqa: E402
+
+
+def split_chunks(text, chunk_size=1000):
+    """Paragraph-packed chunks, close to what the app's splitter produces"""
+    chunks, current = [], ""
+    for paragraph in text.split("\n\n"):
+        if current and len(current) + len(paragraph) > chunk_size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def make_queries(chunks, n_queries, seed=3):
+    """Queries are single sentences taken from random chunks"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n_queries):
+        sentences = [s for s in rng.choice(chunks).split(". ") if len(s) > 20]
+        if sentences:
+            queries.append(rng.choice(sentences))
+    return queries
+
+
+def top_k(doc_vectors, query_vectors, k):
+    import numpy as np
+
+    scores = np.asarray(query_vectors) @ np.asarray(doc_vectors).T
+    return [set(row) for row in np.argsort(-scores, axis=1)[:, :k]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100KB", choices=sorted(SIZES), help="Synthetic document size")
+    parser.add_argument("--backends", nargs="+", default=["hf", "onnx", "onnx-int8"])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = split_chunks(make_document(SIZES[args.size]))
+    queries = make_queries(chunks, args.queries)
+    print(f"📄 {len(chunks)} chunks, {len(queries)} queries, top-{args.k}")
+    print(f"{'backend':>10} {'load s':>8} {'chunks/s':>10} {'query ms':>9} {'agreement':>10}")
+
+    reference = None
+    for name in args.backends:
+        start = time.perf_counter()
+        embeddings = create_embeddings(name)
+        load_seconds = time.perf_counter() - start
+
+        embeddings.embed_documents(chunks[:8])  # warm up
+        start = time.perf_counter()
+        doc_vectors = embeddings.embed_documents(chunks)
+        embed_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        query_vectors = [embeddings.embed_query(q) for q in queries]
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        retrieved = top_k(doc_vectors, query_vectors, args.k)
+        if reference is None:
+            # The first backend (hf by default) is the baseline
+            reference = retrieved
+        agreement = sum(len(a & b) for a, b in zip(retrieved, reference)) / (args.k * len(queries))
+        print(
+            f"{name:>10} {load_seconds:>8.2f} {len(chunks) / embed_seconds:>10.1f} "
+            f"{query_ms:>9.2f} {agreement:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark the single-pass highlighter against the old per-phrase re.sub loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_highlight.py
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from highlighting import highlight_text, find_phrase_spans  # noqa: E402
+
+WORDS = (
+    "the model attention layer dataset training evaluation baseline results "
+    "we propose method transformer accuracy loss gradient benchmark paper "
+    "section figure table experiment analysis data learning neural network"
+).split()
+
+
+def legacy_highlight_text(text, phrases_to_highlight):
+    """The original implementation: one re.sub per phrase over the whole text"""
+    highlighted_text = text
+    for phrase in phrases_to_highlight:
+        if phrase and phrase.strip():
+            pattern = re.escape(phrase.strip())
+            highlighted_text = re.sub(
+                pattern,
+                f"**{phrase.strip()}**",
+                highlighted_text,
+                flags=re.IGNORECASE
+            )
+    return highlighted_text
+
+
+def make_text(n_chars, seed=0):
+    rng = random.Random(seed)
+    words = []
+    size = 0
+    while size < n_chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def make_phrases(text, n_phrases, seed=1):
+    rng = random.Random(seed)
+    words = text.split()
+    phrases = []
+    for _ in range(n_phrases):
+        start = rng.randrange(0, max(1, len(words) - 8))
+        phrases.append(" ".join(words[start:start + rng.randint(3, 8)]))
+    return phrases
+
+
+def time_call(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'chars':>10} {'phrases':>8} {'legacy ms':>10} {'single ms':>10} {'speedup':>8} {'spans':>6}")
+    for n_chars in (500, 10_000, 100_000, 1_000_000):
+        text = make_text(n_chars)
+        for n_phrases in (3, 10, 50):
+            phrases = make_phrases(text, n_phrases)
+            legacy = time_call(legacy_highlight_text, text, phrases)
+            single = time_call(highlight_text, text, phrases)
+            spans = len(find_phrase_spans(text, phrases))
+            print(
+                f"{n_chars:>10} {n_phrases:>8} {legacy * 1000:>10.2f} "
+                f"{single * 1000:>10.2f} {legacy / single:>7.1f}x {spans:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
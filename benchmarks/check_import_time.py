@@ -0,0 +1,107 @@
+"""Fail if the UI shell's cold import goes over budget.
+
+Runs ``python -X importtime`` in a fresh interpreter on the modules that
+main.py imports before anything renders, then checks two things:
+
+* the cumulative import time of the app's own modules stays under
+  ``--budget-ms`` (streamlit itself is reported but budgeted separately
+  with ``--streamlit-budget-ms``), and
+* none of the heavy ML dependencies are imported at all.
+
+    python benchmarks/check_import_time.py --budget-ms 300
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def shell_modules():
+    """The repo's own modules main.py imports at top level (streamlit and the stdlib are left out)"""
+    with open(os.path.join(REPO_ROOT, "main.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module)
+    local = {name.split(".")[0] for name in names}
+    return sorted(name for name in local if os.path.exists(os.path.join(REPO_ROOT, f"{name}.py")))
+
+
+# Derived so new startup imports cannot slip past the budget
+SHELL_MODULES = shell_modules()
+
+# Must only be imported when a feature that needs them runs
+HEAVY_MODULES = [
+    "torch", "sentence_transformers", "transformers", "faiss",
+    "langchain", "langchain_community", "langchain_groq", "groq", "fitz", "onnxruntime",
+]
+
+
+def run_importtime(modules):
+    code = "; ".join(f"import {m}" for m in modules)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"Import failed:\n{completed.stderr[-2000:]}")
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, self_us, cumulative_us, raw_name = line.replace("import time:", "|").split("|")
+        # Nested imports are indented under the module that triggered them
+        depth = len(raw_name) - len(raw_name.lstrip()) - 1
+        timings.append((raw_name.strip(), int(self_us), int(cumulative_us), depth))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="Budget for the app's own modules")
+    parser.add_argument("--streamlit-budget-ms", type=float, default=None, help="Optional budget for streamlit")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest imports")
+    args = parser.parse_args()
+
+    failures = []
+    timings = run_importtime(SHELL_MODULES)
+    top_level = {name: cumulative for name, _, cumulative, depth in timings if depth == 0 and name in SHELL_MODULES}
+    app_ms = sum(top_level.values()) / 1000
+    imported = {name.split(".")[0] for name, _, _, _ in timings}
+
+    print(f"App shell modules: {app_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, cumulative in sorted(top_level.items(), key=lambda item: -item[1]):
+        print(f"  {name:<20} {cumulative / 1000:>8.1f} ms")
+    print("Slowest imports:")
+    for name, _, cumulative, _ in sorted(timings, key=lambda item: -item[2])[:args.top]:
+        print(f"  {name:<40} {cumulative / 1000:>8.1f} ms")
+
+    if app_ms > args.budget_ms:
+        failures.append(f"app shell import took {app_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    heavy = sorted(m for m in HEAVY_MODULES if m in imported)
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+
+    if args.streamlit_budget_ms is not None:
+        streamlit_ms = next((c for n, _, c, d in run_importtime(["streamlit"]) if n == "streamlit" and d == 0), 0) / 1000
+        print(f"streamlit: {streamlit_ms:.1f} ms (budget {args.streamlit_budget_ms:.0f} ms)")
+        if streamlit_ms > args.streamlit_budget_ms:
+            failures.append(f"streamlit import took {streamlit_ms:.1f} ms")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Cold start within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Deterministic stand-ins for Groq and the embedding model.
+
+They let the benchmarks exercise the real backend code paths offline and
+without spending API credits.
+"""
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain.llms.base import LLM
+
+from canned import FAKE_QUESTIONS, canned_response  # noqa: F401
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class FakeLLM(LLM):
+    """LLM that answers every backend prompt with canned, well-formed output.
+
+    ``latency`` seconds (plus up to ``jitter`` seconds, seeded) are slept
+    per call to model the network round trip.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    seed: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-groq"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        self.calls += 1
+        delay = self.latency
+        if self.jitter:
+            digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+            delay += random.Random(digest).uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        return canned_response(prompt)
+
+
+def fake_llm_factory(latency=0.0, jitter=0.0, seed=0):
+    """Factory compatible with groq_llm.set_llm_factory"""
+    def factory(model=None, temperature=0.0):
+        return FakeLLM(latency=latency, jitter=jitter, seed=seed)
+    return factory
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words embeddings from hashed tokens, deterministic and fast.
+
+    Texts sharing words get similar vectors, so retrieval still behaves
+    sensibly in benchmarks. ``call_latency`` and ``per_text_latency``
+    seconds model the cost of a forward pass; passes are serialized as if
+    they shared one CPU.
+    """
+
+    _forward_lock = threading.Lock()
+
+    def __init__(self, dimension=384, call_latency=0.0, per_text_latency=0.0):
+        self.dimension = dimension
+        self.call_latency = call_latency
+        self.per_text_latency = per_text_latency
+
+    def _forward_cost(self, n_texts):
+        delay = self.call_latency + self.per_text_latency * n_texts
+        if delay:
+            with self._forward_lock:
+                time.sleep(delay)
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _WORD_RE.findall(text.lower()):
+            bucket = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest(), "little")
+            vector[bucket % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        self._forward_cost(len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self._forward_cost(1)
+        return self._embed(text)
@@ -0,0 +1,190 @@
+"""Local stand-in for the Groq (OpenAI-compatible) chat completions API.
+
+Answers every backend prompt with the same canned output as FakeLLM,
+after a configurable latency, and fails a configurable fraction of
+requests with 429 or 500 responses. Requests with ``"stream": true`` get
+server-sent ``data:`` chunks ending with ``data: [DONE]``, like Groq.
+Point the app at it with:
+
+    python benchmarks/groq_stub_server.py --port 8901 --latency 0.3 --error-rate 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8901 GROQ_API_KEY=stub streamlit run main.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from canned import canned_response  # noqa: E402
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, jitter=0.0, error_rate=0.0, rate_limit_share=0.5, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # Fraction of injected errors that are 429s rather than 500s
+        self.rate_limit_share = rate_limit_share
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def draw(self):
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            failure = None
+            if self.random.random() < self.error_rate:
+                self.errors += 1
+                failure = 429 if self.random.random() < self.rate_limit_share else 500
+            return delay, failure
+
+
+def _rate_limit_headers():
+    return {
+        "x-ratelimit-limit-requests": "14400",
+        "x-ratelimit-remaining-requests": "14000",
+        "x-ratelimit-reset-requests": "6s",
+        "x-ratelimit-limit-tokens": "30000",
+        "x-ratelimit-remaining-tokens": "25000",
+        "x-ratelimit-reset-tokens": "2s",
+    }
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_stream(self, model, content, usage):
+            """Stream content as chat.completion.chunk events over chunked transfer encoding"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            for name, value in _rate_limit_headers().items():
+                self.send_header(name, value)
+            self.end_headers()
+
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            created = int(time.time())
+
+            def event(delta, finish_reason=None, extra=None):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    **(extra or {})
+                }
+                return f"data: {json.dumps(chunk)}\n\n"
+
+            # Word-sized pieces, keeping the whitespace so the pieces join back exactly
+            pieces = re.findall(r"\S+\s*|\s+", content)
+            events = [event({"role": "assistant", "content": ""})]
+            events += [event({"content": piece}) for piece in pieces]
+            # Groq reports usage on the final chunk
+            events.append(event({}, "stop", {"x_groq": {"usage": usage}}))
+            events.append("data: [DONE]\n\n")
+            for data in events:
+                body = data.encode("utf-8")
+                self.wfile.write(f"{len(body):x}\r\n".encode("ascii") + body + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            delay, failure = config.draw()
+            time.sleep(delay)
+            if failure == 429:
+                headers = _rate_limit_headers()
+                headers.update({"retry-after": "1", "x-ratelimit-remaining-requests": "0"})
+                self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, headers)
+                return
+            if failure == 500:
+                self._send_json(500, {"error": {"message": "Internal stub error"}})
+                return
+
+            prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+            content = canned_response(prompt)
+            prompt_tokens = len(prompt) // 4
+            completion_tokens = len(content) // 4
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+            if payload.get("stream"):
+                self._send_stream(payload.get("model", "stub"), content, usage)
+                return
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }, _rate_limit_headers())
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_stub_server(port=0, **config_kwargs):
+    """Start the stub on a background thread; returns (server, config)"""
+    config = StubConfig(**config_kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="groq-stub", daemon=True).start()
+    return server, config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, _ = start_stub_server(
+        args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed
+    )
+    print(f"Groq stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
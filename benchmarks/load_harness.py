@@ -0,0 +1,237 @@
+"""Concurrent load test of the backend workflows against a local Groq stub.
+
+Each simulated session runs upload -> summary -> N questions -> challenge
+(question generation plus one evaluation) through the real backend and
+the real ChatGroq client, which talks HTTP to groq_stub_server. The
+concurrency is stepped up and latency percentiles and throughput are
+reported at each level:
+
+    python benchmarks/load_harness.py --concurrency 1 4 16 32 --stub-latency 0.3 --error-rate 0.02
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq_stub_server import start_stub_server  # noqa: E402
+from synthetic import make_document  # noqa: E402
+
+QUESTIONS = [
+    "What does the proposed model improve?",
+    "How does the method compare to the baseline?",
+    "What happens to memory use during inference?",
+    "Can you expand on that previous point?",
+    "Which experiment shows the largest gain?",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def time(self, operation):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self.lock:
+                self.errors[operation] += 1
+            raise
+        else:
+            with self.lock:
+                self.latencies[operation].append(time.perf_counter() - start)
+
+
+def run_session(session_id, document, args, recorder):
+    import backend
+    from index_registry import registry, document_hash
+
+    try:
+        with recorder.time("upload"):
+            if args.shared_documents:
+                store = registry.acquire(
+                    document_hash(document), session_id, lambda: backend.prepare_vector_store(document)
+                )
+            else:
+                store = backend.prepare_vector_store(document)
+        with recorder.time("summary"):
+            backend.summarize_document(document)
+        chain = backend.EnhancedConversationalChain(store)
+        for i in range(args.questions):
+            with recorder.time("ask"):
+                chain.ask_question(QUESTIONS[i % len(QUESTIONS)])
+        with recorder.time("challenge"):
+            questions = backend.generate_logic_questions(document)
+        with recorder.time("evaluate"):
+            backend.evaluate_user_response(document[:3000], questions[0]["question"], questions[0]["options"][0])
+        return True
+    except Exception as e:
+        print(f"session {session_id} failed: {e}", file=sys.stderr)
+        return False
+    finally:
+        if args.shared_documents:
+            registry.release(document_hash(document), session_id)
+
+
+def run_level(concurrency, args, documents):
+    from embedding_batcher import batched_queries_total, embedding_batches_total
+
+    queries_before, batches_before = batched_queries_total.value(), embedding_batches_total.value()
+    recorder = Recorder()
+    n_sessions = concurrency * args.sessions_per_worker
+    sink = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_session, f"load-{concurrency}-{i}", documents[i % len(documents)], args, recorder)
+            for i in range(n_sessions)
+        ]
+        completed = sum(1 for f in futures if f.result())
+    elapsed = time.perf_counter() - start
+
+    operations = {}
+    total_requests = 0
+    # Operations that only failed have no latencies but are still reported
+    for operation in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = recorder.latencies.get(operation, [])
+        total_requests += len(values) + recorder.errors[operation]
+        operations[operation] = {
+            "count": len(values),
+            "errors": recorder.errors[operation],
+            "p50_s": percentile(values, 50),
+            "p95_s": percentile(values, 95),
+            "p99_s": percentile(values, 99),
+        }
+    return {
+        "concurrency": concurrency,
+        "sessions": n_sessions,
+        "completed_sessions": completed,
+        "elapsed_s": elapsed,
+        "sessions_per_s": completed / elapsed,
+        "requests_per_s": total_requests / elapsed,
+        "operations": operations,
+        "batched_queries": batched_queries_total.value() - queries_before,
+        "query_batches": embedding_batches_total.value() - batches_before,
+    }
+
+
+def print_level(result):
+    print(
+        f"\nconcurrency={result['concurrency']} sessions={result['completed_sessions']}/{result['sessions']} "
+        f"elapsed={result['elapsed_s']:.1f}s sessions/s={result['sessions_per_s']:.2f} "
+        f"requests/s={result['requests_per_s']:.2f}"
+    )
+    if result["query_batches"]:
+        print(
+            f"  query embedding: wait={result['embed_batch_wait_ms']:g}ms {result['batched_queries']} queries "
+            f"in {result['query_batches']} batches (avg {result['batched_queries'] / result['query_batches']:.1f})"
+        )
+    print(f"  {'operation':<10} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for operation, stats in result["operations"].items():
+        timings = " ".join(
+            f"{'-':>9}" if stats[key] is None else f"{stats[key] * 1000:>9.1f}" for key in ("p50_s", "p95_s", "p99_s")
+        )
+        print(f"  {operation:<10} {stats['count']:>6} {stats['errors']:>6} {timings}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--sessions-per-worker", type=int, default=2)
+    parser.add_argument("--questions", type=int, default=3, help="Questions asked per session")
+    parser.add_argument("--document-kb", type=int, default=100)
+    parser.add_argument("--distinct-documents", type=int, default=4)
+    parser.add_argument("--shared-documents", action="store_true", help="Share indexes through the index registry")
+    parser.add_argument("--stub-latency", type=float, default=0.3)
+    parser.add_argument("--stub-jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--base-url", help="Use an already running stub instead of starting one")
+    parser.add_argument("--real-embeddings", action="store_true")
+    parser.add_argument("--embed-call-ms", type=float, default=0.0, help="Simulated fixed cost per embedding forward pass")
+    parser.add_argument("--embed-per-text-ms", type=float, default=0.0, help="Simulated cost per embedded text")
+    parser.add_argument("--embed-batch-wait-ms", type=float, default=0.0, help="Query micro-batching max wait (0 disables)")
+    parser.add_argument("--embed-max-batch", type=int, default=32)
+    parser.add_argument("--compare-batching", action="store_true",
+                        help="Run each level without and with query micro-batching and report the gain")
+    parser.add_argument("--rate-limiter", action="store_true",
+                        help="Pace calls with the Groq rate limiter (synced from the stub's headers); off by default "
+                             "so results measure the node, not the free-tier limits")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("ez_genai.requests").setLevel(logging.WARNING)
+
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server, _ = start_stub_server(
+            latency=args.stub_latency, jitter=args.stub_jitter, error_rate=args.error_rate
+        )
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY") or "stub"
+    print(f"Using Groq stub at {base_url}")
+
+    import backend
+    from rate_limiter import limiter
+    # 429s from the stub are still retried with backoff either way
+    limiter.enabled = args.rate_limiter
+    if args.real_embeddings:
+        from embedding_backends import create_embeddings
+        base_embeddings = create_embeddings()
+    else:
+        from fakes import HashingEmbeddings
+        base_embeddings = HashingEmbeddings(
+            call_latency=args.embed_call_ms / 1000, per_text_latency=args.embed_per_text_ms / 1000
+        )
+    batch_waits = [0.0, args.embed_batch_wait_ms or 5.0] if args.compare_batching else [args.embed_batch_wait_ms]
+
+    documents = [make_document(args.document_kb * 1024, seed=i) for i in range(args.distinct_documents)]
+    results = []
+    for concurrency in args.concurrency:
+        by_wait = {}
+        for wait_ms in batch_waits:
+            backend.set_embeddings(backend.batch_queries(base_embeddings, wait_ms, args.embed_max_batch))
+            result = run_level(concurrency, args, documents)
+            result["embed_batch_wait_ms"] = wait_ms
+            print_level(result)
+            results.append(result)
+            by_wait[wait_ms] = result
+        if args.compare_batching:
+            unbatched, batched = by_wait[batch_waits[0]], by_wait[batch_waits[1]]
+            ask_before = unbatched["operations"].get("ask", {}).get("p50_s")
+            ask_after = batched["operations"].get("ask", {}).get("p50_s")
+            print(
+                f"  micro-batching gain: requests/s x{batched['requests_per_s'] / unbatched['requests_per_s']:.2f}"
+                + (f", ask p50 {ask_before * 1000:.0f} -> {ask_after * 1000:.0f} ms" if ask_before and ask_after else "")
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Offline benchmarks for the backend hot paths.
+
+Uses a fake LLM (canned ANSWER/SUPPORTING_QUOTES and JSON output with
+configurable latency) and hashing embeddings, so no Groq credits or model
+downloads are needed. Results can be saved and compared across commits:
+
+    python benchmarks/run_benchmarks.py --sizes 10KB 100KB 1MB --output base.json
+    git checkout my-branch
+    python benchmarks/run_benchmarks.py --sizes 10KB 100KB 1MB --compare base.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FAKE_QUESTIONS, HashingEmbeddings, fake_llm_factory  # noqa: E402
+from synthetic import SIZES, make_document  # noqa: E402
+
+QUESTIONS = [
+    "What does the proposed model improve?",
+    "How does the method compare to the baseline?",
+    "What happens to memory use during inference?",
+    "Which dataset is used in the experiments?",
+]
+
+
+def measure(fn, repeat, track_memory=True):
+    """Time fn over repeat runs, then measure its peak traced memory once"""
+    timings = []
+    sink = io.StringIO()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            fn()
+        timings.append(time.perf_counter() - start)
+        sink.seek(0)
+        sink.truncate()
+
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        with contextlib.redirect_stdout(sink):
+            fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "median_s": statistics.median(timings),
+        "p95_s": timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        "min_s": timings[0],
+        "peak_mb": peak_mb,
+    }
+
+
+def run_size(label, n_bytes, args):
+    import backend
+
+    document = make_document(n_bytes, seed=args.seed)
+    mb = len(document) / 1e6
+    results = []
+
+    def record(function, stats, work, unit):
+        stats.update({
+            "function": function,
+            "size": label,
+            "throughput": work / stats["median_s"] if stats["median_s"] else None,
+            "unit": unit,
+        })
+        results.append(stats)
+        peak = f"{stats['peak_mb']:.1f}" if stats["peak_mb"] is not None else "-"
+        print(
+            f"{function:<28} {label:>6} {stats['median_s'] * 1000:>10.2f} "
+            f"{stats['p95_s'] * 1000:>10.2f} {stats['throughput']:>12.2f} {unit:<6} {peak:>8}"
+        )
+
+    repeat = args.repeat if n_bytes <= SIZES["1MB"] else 1
+    track_memory = not args.no_memory
+
+    store = backend.prepare_vector_store(document)
+    record(
+        "prepare_vector_store",
+        measure(lambda: backend.prepare_vector_store(document), repeat, track_memory),
+        mb, "MB/s"
+    )
+
+    # The quote index is kept for every shared index, so its size matters as much as its build time
+    from grounding import QuoteIndex
+    stats = measure(lambda: QuoteIndex(document), repeat, track_memory)
+    stats["index_bytes"] = QuoteIndex(document).memory_bytes()
+    record("QuoteIndex", stats, mb, "MB/s")
+    print(f"{'':<28} {label:>6} quote index {stats['index_bytes'] / 1e6:.1f} MB "
+          f"({stats['index_bytes'] / max(1, len(document)):.1f} bytes per document byte)")
+
+    def ask_all():
+        for question in QUESTIONS:
+            backend.qa_chain_with_highlighting(store, question)
+    record("qa_chain_with_highlighting", measure(ask_all, args.repeat, track_memory), len(QUESTIONS), "q/s")
+
+    chunk = document[:min(len(document), SIZES["1MB"])]
+    quotes = [chunk[i:i + 80] for i in range(0, len(chunk), max(1, len(chunk) // 20))][:20]
+    record(
+        "highlight_text",
+        measure(lambda: backend.highlight_text(chunk, quotes), args.repeat, track_memory),
+        len(chunk) / 1e6, "MB/s"
+    )
+
+    # LLM chatter around the JSON array scales with the document size
+    response = document[:min(len(document), SIZES["1MB"])] + json.dumps(FAKE_QUESTIONS) + "\nHope this helps!"
+    record(
+        "clean_json_response",
+        measure(lambda: backend.clean_json_response(response), args.repeat, track_memory),
+        len(response) / 1e6, "MB/s"
+    )
+
+    record(
+        "generate_logic_questions",
+        measure(lambda: backend.generate_logic_questions(document), args.repeat, track_memory),
+        1, "call/s"
+    )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {(r["function"], r["size"]): r for r in json.load(f)["results"]}
+
+    print(f"\nComparison against {baseline_path} (ratio > {threshold} flagged):")
+    regressions = 0
+    for result in results:
+        base = baseline.get((result["function"], result["size"]))
+        if not base:
+            continue
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{result['function']:<28} {result['size']:>6} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["10KB", "100KB", "1MB"], choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake LLM latency per call in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Extra random latency up to this many seconds")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured embedding model")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    # Keep per-request JSON logs out of the benchmark output
+    logging.getLogger("ez_genai.requests").setLevel(logging.WARNING)
+
+    import backend
+    from groq_llm import set_llm_factory
+
+    set_llm_factory(fake_llm_factory(args.llm_latency, args.llm_jitter, args.seed))
+    if not args.real_embeddings:
+        backend.set_embeddings(HashingEmbeddings())
+
+    print(f"{'function':<28} {'size':>6} {'median ms':>10} {'p95 ms':>10} {'throughput':>12} {'unit':<6} {'peak MB':>8}")
+    results = []
+    for label in args.sizes:
+        results.extend(run_size(label, SIZES[label], args))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "llm_latency": args.llm_latency,
+            "real_embeddings": args.real_embeddings,
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
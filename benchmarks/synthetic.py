@@ -0,0 +1,42 @@
+"""Synthetic research-paper-like documents of a given size."""
+import random
+
+SECTIONS = ["Abstract", "Introduction", "Related Work", "Method", "Experiments", "Results", "Discussion", "Conclusion"]
+SUBJECTS = ["The proposed model", "Our method", "The baseline", "The attention layer", "This approach", "The dataset"]
+VERBS = ["improves", "reduces", "outperforms", "matches", "extends", "simplifies"]
+OBJECTS = [
+    "accuracy on the benchmark", "training time by a large margin", "prior work on long documents",
+    "the transformer architecture", "memory use during inference", "the evaluation protocol"
+]
+QUALIFIERS = ["in all settings", "on average", "for small batches", "with fewer parameters", "under noisy labels", ""]
+
+SIZES = {
+    "10KB": 10 * 1024,
+    "100KB": 100 * 1024,
+    "1MB": 1024 * 1024,
+    "10MB": 10 * 1024 * 1024,
+    "50MB": 50 * 1024 * 1024,
+}
+
+
+def sentence(rng):
+    parts = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(QUALIFIERS)]
+    return " ".join(p for p in parts if p) + f" (experiment {rng.randint(1, 999)})."
+
+
+def make_document(n_bytes, seed=0):
+    """Build a deterministic document of roughly n_bytes characters"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    section = 0
+    while size < n_bytes:
+        heading = f"{section % len(SECTIONS) + 1} {SECTIONS[section % len(SECTIONS)]}\n\n"
+        parts.append(heading)
+        size += len(heading)
+        for _ in range(rng.randint(3, 8)):
+            paragraph = " ".join(sentence(rng) for _ in range(rng.randint(3, 7))) + "\n\n"
+            parts.append(paragraph)
+            size += len(paragraph)
+        section += 1
+    return "".join(parts)[:n_bytes]
@@ -0,0 +1,195 @@
+"""Structure-aware chunking for research papers.
+
+Splits extracted text along the paper's own structure instead of fixed
+500-character windows: running page headers/footers and page numbers are
+dropped, headings start new chunks, paragraphs are packed up to a size
+that fits the embedding model, and the reference section is packed into
+large chunks tagged ``section_type="references"`` so retrieval can rank it
+below the body. Every chunk is an exact slice of the text, so start/end
+offsets stay valid for quote grounding.
+"""
+import re
+from bisect import bisect_right
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces, roughly 1000 characters
+MAX_CHUNK_CHARS = 1000
+MIN_CHUNK_CHARS = 200
+REFERENCE_CHUNK_CHARS = 3000
+
+# Unnumbered lines only count as headings with one of these names; words
+# like "Model" or "Method" also head table columns and figure labels
+SECTION_NAMES = (
+    "abstract", "introduction", "background", "related work", "preliminaries",
+    "methods", "methodology", "experiments",
+    "experimental setup", "evaluation", "results", "discussion", "analysis",
+    "limitations", "conclusion", "conclusions", "future work", "acknowledgements",
+    "acknowledgments", "appendix", "references", "bibliography"
+)
+REFERENCE_HEADINGS = ("references", "bibliography", "works cited")
+
+# "3 Method", "2.1 Training setup", "IV. RESULTS", "A. Proofs", "Appendix B"
+_NUMBERED_HEADING = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.|[A-Z]\.|appendix\s+[A-Z0-9]+[.:]?)\s+\S",
+    re.IGNORECASE
+)
+_PAGE_NUMBER = re.compile(r"^(?:page\s+)?\d+(?:\s*(?:/|of)\s*\d+)?$", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+
+# Lines scanned at the top and bottom of each page for running headers/footers
+_EDGE_LINES = 3
+
+
+def _lines(text):
+    """(start, end) offsets of every line, without the newline"""
+    spans = []
+    start = 0
+    for match in re.finditer(r"\n", text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return spans
+
+
+def _normalize(line):
+    return _DIGITS.sub("#", " ".join(line.lower().split()))
+
+
+def _strip_number(title):
+    return re.sub(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.|[A-Z]\.)\s+", "", title).strip().rstrip(":").lower()
+
+
+def heading_title(line):
+    """Return the heading text if a line looks like a section heading, else None"""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80:
+        return None
+    if _strip_number(stripped) in SECTION_NAMES:
+        return stripped
+    words = stripped.split()
+    # Numbered lines must read like titles, not sentences, list items or equations
+    if (_NUMBERED_HEADING.match(stripped) and 2 <= len(words) <= 10
+            and not stripped.endswith((".", ",", ";")) and words[1][:1].isupper()):
+        return stripped
+    return None
+
+
+def find_boilerplate_lines(text, line_spans, page_starts):
+    """Indexes of running header/footer and page-number lines"""
+    # Group non-empty line indexes by page (one page without page starts)
+    pages = {}
+    for i, (start, end) in enumerate(line_spans):
+        if text[start:end].strip():
+            pages.setdefault(bisect_right(page_starts or [], start), []).append(i)
+
+    # Page numbers only at the top or bottom of a page; a bare number elsewhere is content (e.g. a table cell)
+    boilerplate = set()
+    for line_indexes in pages.values():
+        for i in line_indexes[:_EDGE_LINES] + line_indexes[-_EDGE_LINES:]:
+            start, end = line_spans[i]
+            if _PAGE_NUMBER.match(text[start:end].strip()):
+                boilerplate.add(i)
+    if not page_starts or len(page_starts) < 3:
+        return boilerplate
+
+    # A line repeated (ignoring digits) at the edge of many pages is a running header/footer
+    edges = {}
+    for line_indexes in pages.values():
+        for i in line_indexes[:_EDGE_LINES] + line_indexes[-_EDGE_LINES:]:
+            start, end = line_spans[i]
+            edges.setdefault(_normalize(text[start:end]), set()).add(i)
+    threshold = max(3, len(pages) // 2)
+    for found in edges.values():
+        if len({bisect_right(page_starts, line_spans[i][0]) for i in found}) >= threshold:
+            boilerplate.update(found)
+    return boilerplate
+
+
+def _blocks(text, line_spans, boilerplate):
+    """Yield (kind, start, end) for headings, paragraphs and dropped boilerplate lines"""
+    block_start = block_end = None
+    for i, (start, end) in enumerate(line_spans):
+        line = text[start:end]
+        if i in boilerplate:
+            kind = "break"
+        elif heading_title(line):
+            kind = "heading"
+        elif not line.strip():
+            kind = "blank"
+        else:
+            if block_start is None:
+                block_start = start + len(line) - len(line.lstrip())
+            block_end = start + len(line.rstrip())
+            continue
+        if block_start is not None:
+            yield "text", block_start, block_end
+            block_start = None
+        if kind != "blank":
+            yield kind, start, end
+    if block_start is not None:
+        yield "text", block_start, block_end
+
+
+def _pieces(text, start, end, limit, min_chars):
+    """Cut a long paragraph at sentence ends into pieces of at most limit characters"""
+    while end - start > limit:
+        cut = text.rfind(". ", start, start + limit)
+        cut = cut + 1 if cut > start + min_chars else start + limit
+        yield start, cut
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield start, end
+
+
+def split_structured(text, page_starts=None, max_chunk_chars=MAX_CHUNK_CHARS,
+                     min_chunk_chars=MIN_CHUNK_CHARS, reference_chunk_chars=REFERENCE_CHUNK_CHARS):
+    """Split a paper into (start, end, section, section_type) chunks.
+
+    Paragraphs are packed into chunks that never cross a heading or a
+    dropped header/footer line, and each chunk is text[start:end].
+    """
+    line_spans = _lines(text)
+    boilerplate = find_boilerplate_lines(text, line_spans, page_starts)
+
+    chunks = []
+    section, section_type = "", "body"
+    current = None
+
+    for kind, start, end in _blocks(text, line_spans, boilerplate):
+        if kind == "heading":
+            title = text[start:end].strip()
+            name = _strip_number(title)
+            if name in REFERENCE_HEADINGS:
+                section_type = "references"
+            elif section_type == "references" and name not in SECTION_NAMES and not name.startswith("appendix"):
+                # Numbered lines inside a bibliography are entries, not new sections
+                kind = "text"
+            else:
+                section_type = "body"
+            if kind == "heading":
+                if current:
+                    chunks.append(current)
+                section = title
+                # The heading opens the next chunk so its title is embedded with the text
+                title_start = text.index(title, start)
+                current = [title_start, title_start + len(title), section, section_type]
+                continue
+
+        if kind == "break":
+            if current:
+                chunks.append(current)
+            current = None
+            continue
+
+        limit = reference_chunk_chars if section_type == "references" else max_chunk_chars
+        for piece_start, piece_end in _pieces(text, start, end, limit, min_chunk_chars):
+            if current and piece_end - current[0] <= limit:
+                current[1] = piece_end
+            else:
+                if current:
+                    chunks.append(current)
+                current = [piece_start, piece_end, section, section_type]
+    if current:
+        chunks.append(current)
+    return [tuple(chunk) for chunk in chunks]
@@ -0,0 +1,192 @@
+"""Compact in-memory layout for per-document vector stores.
+
+By default a FAISS store keeps float32 vectors plus one Document object and
+metadata dict per chunk. Here vectors can be stored as float16 or product
+quantized codes, and chunk text/metadata live in columns: one text buffer
+with offsets and one array per metadata field. Documents are only built
+when a search returns them.
+"""
+import math
+import operator
+import os
+import sys
+from array import array
+from collections.abc import Mapping
+
+# float32 (exact), float16 (2x smaller) or pq (product quantized, ~32x smaller)
+VECTOR_STORAGE = os.getenv("EZ_VECTOR_STORAGE", "float32").lower()
+# Store chunk text/metadata as columns instead of Document objects
+COMPACT_DOCSTORE = os.getenv("EZ_COMPACT_DOCSTORE", "0") == "1"
+
+# Sentinel for a missing value in an integer column
+_MISSING = -(2 ** 63)
+
+
+class ColumnarDocstore:
+    """Read-only docstore keeping chunk text in one buffer plus metadata columns.
+
+    Integer metadata fields are packed into array('q'); any other field
+    falls back to a plain list. Ids are the chunk positions 0..n-1.
+    """
+
+    def __init__(self, texts, metadatas=None):
+        metadatas = metadatas or [{} for _ in texts]
+        self.buffer = "".join(texts)
+        self.offsets = array("q", [0])
+        for text in texts:
+            self.offsets.append(self.offsets[-1] + len(text))
+
+        self.columns = {}
+        keys = sorted({key for metadata in metadatas for key in metadata})
+        for key in keys:
+            values = [metadata.get(key) for metadata in metadatas]
+            if all(value is None or (isinstance(value, int) and not isinstance(value, bool)) for value in values):
+                self.columns[key] = array("q", (_MISSING if value is None else value for value in values))
+            else:
+                self.columns[key] = values
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def text(self, position):
+        return self.buffer[self.offsets[position]:self.offsets[position + 1]]
+
+    def metadata(self, position):
+        metadata = {}
+        for key, column in self.columns.items():
+            value = column[position]
+            if value is not None and value != _MISSING:
+                metadata[key] = value
+        return metadata
+
+    def search(self, search_id):
+        """Build the Document for a chunk id (LangChain docstore interface)"""
+        from langchain.docstore.document import Document
+
+        try:
+            position = operator.index(search_id)
+        except TypeError:
+            return f"ID {search_id} not found."
+        if not 0 <= position < len(self):
+            return f"ID {search_id} not found."
+        return Document(page_content=self.text(position), metadata=self.metadata(position))
+
+    def add(self, texts):
+        raise NotImplementedError("Compact docstores are read-only; rebuild the index instead")
+
+    def delete(self, ids):
+        raise NotImplementedError("Compact docstores are read-only; rebuild the index instead")
+
+    def memory_bytes(self):
+        total = sys.getsizeof(self.buffer) + self.offsets.itemsize * len(self.offsets)
+        for column in self.columns.values():
+            if isinstance(column, array):
+                total += column.itemsize * len(column)
+            else:
+                total += sys.getsizeof(column) + sum(sys.getsizeof(value) for value in column)
+        return total
+
+
+class PositionIds(Mapping):
+    """index_to_docstore_id mapping where FAISS row i is docstore id i"""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, key):
+        position = operator.index(key)
+        if not 0 <= position < self.size:
+            raise KeyError(key)
+        return position
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def __len__(self):
+        return self.size
+
+
+def _pq_parameters(n_vectors, dimension):
+    """Pick (sub-quantizers, bits) for PQ, or None if there is too little data to train"""
+    # Each codebook needs a few training points per centroid
+    nbits = min(8, int(math.log2(max(1, n_vectors // 4))))
+    if nbits < 4:
+        return None
+    # Aim for 8 dimensions per sub-quantizer, which must divide the dimension
+    m = max(1, dimension // 8)
+    while dimension % m:
+        m -= 1
+    return m, nbits
+
+
+def build_faiss_index(vectors, storage=None):
+    """Build a FAISS L2 index holding vectors as float32, float16 or PQ codes"""
+    import faiss
+    import numpy as np
+
+    storage = (storage or VECTOR_STORAGE).lower()
+    matrix = np.ascontiguousarray(np.asarray(vectors, dtype="float32"))
+    dimension = matrix.shape[1]
+
+    if storage == "pq":
+        parameters = _pq_parameters(len(matrix), dimension)
+        if parameters is None:
+            # Too few chunks to train codebooks; float16 loses almost nothing
+            storage = "float16"
+        else:
+            index = faiss.IndexPQ(dimension, parameters[0], parameters[1], faiss.METRIC_L2)
+    if storage == "float16":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    elif storage == "float32":
+        index = faiss.IndexFlatL2(dimension)
+    elif storage != "pq":
+        raise ValueError(f"Unknown vector storage: {storage}")
+
+    if not index.is_trained:
+        index.train(matrix)
+    index.add(matrix)
+    return index
+
+
+def build_vector_store(texts, vectors, metadatas, embeddings, storage=None, compact_docstore=None):
+    """Create a FAISS vector store with the configured vector and docstore layout"""
+    from langchain.vectorstores import FAISS
+
+    storage = (storage or VECTOR_STORAGE).lower()
+    compact_docstore = COMPACT_DOCSTORE if compact_docstore is None else compact_docstore
+    if storage == "float32" and not compact_docstore:
+        return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas)
+
+    index = build_faiss_index(vectors, storage)
+    if compact_docstore:
+        docstore = ColumnarDocstore(texts, metadatas)
+        index_to_docstore_id = PositionIds(len(texts))
+    else:
+        from langchain.docstore import InMemoryDocstore
+        from langchain.docstore.document import Document
+
+        docstore = InMemoryDocstore({
+            str(i): Document(page_content=text, metadata=metadata)
+            for i, (text, metadata) in enumerate(zip(texts, metadatas))
+        })
+        index_to_docstore_id = {i: str(i) for i in range(len(texts))}
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def vector_bytes(index):
+    """Bytes held by the vectors/codes of a FAISS index"""
+    if index is None or not hasattr(index, "ntotal"):
+        return 0
+    try:
+        return index.sa_code_size() * index.ntotal
+    except Exception:
+        return index.ntotal * index.d * 4
+
+
+def vector_storage_name(index):
+    name = type(index).__name__
+    if "PQ" in name:
+        return "pq"
+    if "ScalarQuantizer" in name:
+        return "float16"
+    return "float32"
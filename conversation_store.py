@@ -0,0 +1,140 @@
+"""Append-only SQLite store of Memory Chat exchanges.
+
+Exchanges are keyed by session and document hash and read back a page at
+a time, so long conversations survive restarts without being held in
+RAM or re-rendered in full on every Streamlit rerun. Clearing a chat
+records a marker instead of deleting rows.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import document_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exchanges (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    doc_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    quotes BLOB
+);
+CREATE INDEX IF NOT EXISTS exchanges_by_conversation ON exchanges (session_id, doc_hash, id);
+CREATE TABLE IF NOT EXISTS clears (
+    session_id TEXT NOT NULL,
+    doc_hash TEXT NOT NULL,
+    last_cleared_id INTEGER NOT NULL,
+    cleared_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clears_by_conversation ON clears (session_id, doc_hash);
+"""
+
+# Exchanges after the most recent clear marker
+_VISIBLE = """
+session_id = ? AND doc_hash = ? AND id > COALESCE(
+    (SELECT MAX(last_cleared_id) FROM clears WHERE session_id = ? AND doc_hash = ?), 0
+)
+"""
+
+
+def _pack(values):
+    return zlib.compress(json.dumps(values).encode("utf-8")) if values else None
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8")) if blob else []
+
+
+class ConversationStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        # SQLite connections cannot be shared across threads; keep one per thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def append(self, session_id, doc_hash, question, answer, supporting_quotes=None):
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO exchanges (session_id, doc_hash, created_at, question, answer, quotes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, doc_hash, time.time(), question, answer, _pack(supporting_quotes))
+            )
+            return cursor.lastrowid
+
+    def count(self, session_id, doc_hash):
+        row = self._connect().execute(
+            f"SELECT COUNT(*) FROM exchanges WHERE {_VISIBLE}", (session_id, doc_hash) * 2
+        ).fetchone()
+        return row[0]
+
+    def page(self, session_id, doc_hash, page=0, page_size=10):
+        """Exchanges of one page, newest page first, oldest-first within the page.
+
+        Each exchange has an ``index`` numbering it from 1 in conversation order.
+        """
+        total = self.count(session_id, doc_hash)
+        offset = max(0, total - (page + 1) * page_size)
+        limit = min(page_size, total - page * page_size)
+        if limit <= 0:
+            return []
+        rows = self._connect().execute(
+            f"SELECT question, answer, quotes, created_at FROM exchanges WHERE {_VISIBLE} "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (session_id, doc_hash) * 2 + (limit, offset)
+        ).fetchall()
+        return [
+            {
+                "index": offset + i + 1,
+                "question": question,
+                "answer": answer,
+                "supporting_quotes": _unpack(quotes),
+                "created_at": created_at,
+            }
+            for i, (question, answer, quotes, created_at) in enumerate(rows)
+        ]
+
+    def recent_turns(self, session_id, doc_hash, n):
+        """The last n (question, answer) pairs, oldest first, to restore chat memory"""
+        rows = self._connect().execute(
+            f"SELECT question, answer FROM exchanges WHERE {_VISIBLE} ORDER BY id DESC LIMIT ?",
+            (session_id, doc_hash) * 2 + (n,)
+        ).fetchall()
+        return list(reversed(rows))
+
+    def clear(self, session_id, doc_hash):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO clears (session_id, doc_hash, last_cleared_id, cleared_at) "
+                "SELECT ?, ?, COALESCE(MAX(id), 0), ? FROM exchanges",
+                (session_id, doc_hash, time.time())
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """Process-wide store under the shared store root (EZ_CONVERSATION_DB overrides)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.getenv("EZ_CONVERSATION_DB") or os.path.join(document_store.STORE_DIR, "conversations.sqlite3")
+            _store = ConversationStore(path)
+    return _store
@@ -0,0 +1,96 @@
+"""Near-duplicate chunk detection with MinHash and LSH banding.
+
+Conference PDFs repeat running headers, copyright notices and near
+identical paragraphs. Collapsing them before embedding saves embedding
+time and keeps retrieval from returning several copies of the same text.
+"""
+import re
+import zlib
+
+from metrics import Counter
+
+duplicate_chunks_total = Counter("ez_duplicate_chunks_total", "Chunks collapsed into a near-duplicate before embedding")
+embed_seconds_saved_total = Counter("ez_embed_seconds_saved_total", "Estimated embedding seconds saved by deduplication")
+
+_WORD = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+NUM_PERM = 64
+BANDS = 16
+# Estimated Jaccard similarity above which two chunks are treated as copies
+THRESHOLD = 0.8
+
+
+def shingles(text, size=5):
+    """Hashed word n-grams of a chunk (the whole text if it is shorter)"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+class MinHasher:
+    """MinHash signatures from NUM_PERM universal hash functions"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        import numpy as np
+
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, shingle_set):
+        import numpy as np
+
+        if not shingle_set:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        # (a * x + b) mod p, truncated to 32 bits; uint64 wraparound is fine for hashing
+        hashed = ((values[:, None] * self.a + self.b) % _MERSENNE_PRIME) & _MAX_HASH
+        return hashed.min(axis=0)
+
+
+def find_near_duplicates(texts, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """Group near-identical texts.
+
+    Returns a list with, for every text, the position of its canonical
+    text (the first occurrence of its group); canonical texts map to
+    themselves.
+    """
+    import numpy as np
+
+    hasher = MinHasher(num_perm)
+    signatures = [hasher.signature(shingles(text)) for text in texts]
+    rows = num_perm // bands
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Texts sharing any band bucket are candidates; confirm on the full signature
+    for band in range(bands):
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            if not texts[i].strip():
+                continue
+            key = signature[band * rows:(band + 1) * rows].tobytes()
+            first = buckets.setdefault(key, i)
+            if first == i:
+                continue
+            root_i, root_first = find(i), find(first)
+            if root_i == root_first:
+                continue
+            if np.mean(signatures[i] == signatures[first]) >= threshold:
+                # The earlier chunk stays canonical
+                parent[max(root_i, root_first)] = min(root_i, root_first)
+
+    return [find(i) for i in range(len(texts))]
@@ -0,0 +1,113 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+# Root of the on-disk stores shared by the app, the batch CLI and the API
+STORE_DIR = os.getenv("EZ_STORE_DIR", ".ez_store")
+
+
+def _path(*parts):
+    return os.path.join(STORE_DIR, *parts)
+
+
+def _atomic_write(path, data, mode="w"):
+    """Write to a temp file and rename it, so readers never see partial files"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def index_path(doc_hash):
+    return _path("indexes", doc_hash)
+
+
+def has_index(doc_hash):
+    return os.path.exists(os.path.join(index_path(doc_hash), "index.faiss"))
+
+
+def save_index(doc_hash, vector_store):
+    """Persist a FAISS store and its quote index under the document hash"""
+    target = index_path(doc_hash)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(target), prefix=".tmp-")
+    try:
+        vector_store.save_local(tmp_dir)
+        quote_index = getattr(vector_store, "quote_index", None)
+        if quote_index is not None:
+            with open(os.path.join(tmp_dir, "quote_index.pkl"), "wb") as f:
+                pickle.dump(quote_index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(tmp_dir, target)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def load_index(doc_hash, embeddings):
+    """Load a persisted FAISS store, or return None if it is not on disk"""
+    from langchain.vectorstores import FAISS
+
+    if not has_index(doc_hash):
+        return None
+    path = index_path(doc_hash)
+    try:
+        vector_store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    except TypeError:
+        # Older langchain versions do not take the flag
+        vector_store = FAISS.load_local(path, embeddings)
+
+    quote_index_file = os.path.join(path, "quote_index.pkl")
+    if os.path.exists(quote_index_file):
+        with open(quote_index_file, "rb") as f:
+            vector_store.quote_index = pickle.load(f)
+    return vector_store
+
+
+def text_path(doc_hash):
+    return _path("documents", f"{doc_hash}.json")
+
+
+def has_document(doc_hash):
+    return os.path.exists(text_path(doc_hash))
+
+
+def save_document(doc_hash, text, page_starts=None):
+    """Persist extracted text so any worker can serve the document later"""
+    _atomic_write(text_path(doc_hash), json.dumps({"text": text, "page_starts": page_starts}))
+
+
+def load_document(doc_hash):
+    """Return (text, page_starts) for a stored document, or (None, None)"""
+    try:
+        with open(text_path(doc_hash)) as f:
+            data = json.load(f)
+        return data["text"], data.get("page_starts")
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+def summary_path(doc_hash):
+    return _path("summaries", f"{doc_hash}.json")
+
+
+def load_summary(doc_hash):
+    try:
+        with open(summary_path(doc_hash)) as f:
+            return json.load(f)["summary"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_summary(doc_hash, summary):
+    _atomic_write(summary_path(doc_hash), json.dumps({"summary": summary, "created_at": time.time()}))
@@ -0,0 +1,123 @@
+import os
+
+from langchain.embeddings.base import Embeddings
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Where exported / quantized ONNX models are cached
+ONNX_CACHE_DIR = os.getenv("EZ_ONNX_CACHE_DIR", os.path.join(".ez_store", "onnx"))
+
+
+def _export_onnx(model_dir):
+    """Export all-MiniLM-L6-v2 to ONNX once; needs torch and transformers only here"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME).eval()
+    tokenizer.save_pretrained(model_dir)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "token_type_ids": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"}}
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        os.path.join(model_dir, "model.onnx"),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14
+    )
+
+
+def _quantize(model_dir):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        os.path.join(model_dir, "model.onnx"),
+        os.path.join(model_dir, "model.int8.onnx"),
+        weight_type=QuantType.QInt8
+    )
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 sentence embeddings on ONNX Runtime.
+
+    Mirrors the sentence-transformers pipeline (mean pooling over tokens,
+    then L2 normalization) without importing torch at inference time.
+    ``quantize=True`` uses a dynamically int8-quantized copy of the model.
+    A LangChain Embeddings, so it can be passed straight to FAISS.
+    """
+
+    def __init__(self, quantize=False, batch_size=64, max_length=256, num_threads=None, model_dir=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir or os.path.join(ONNX_CACHE_DIR, "all-MiniLM-L6-v2")
+        model_file = os.path.join(self.model_dir, "model.int8.onnx" if quantize else "model.onnx")
+        if not os.path.exists(os.path.join(self.model_dir, "model.onnx")):
+            print(f"📦 Exporting {MODEL_NAME} to ONNX in {self.model_dir}...")
+            _export_onnx(self.model_dir)
+        if quantize and not os.path.exists(model_file):
+            print("📦 Quantizing ONNX model to int8...")
+            _quantize(self.model_dir)
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+        self.quantize = quantize
+
+    def _embed_batch(self, texts):
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed_batch([text])[0].tolist()
+
+
+def create_embeddings(backend_name=None):
+    """Build the embedding model named by EZ_EMBEDDING_BACKEND.
+
+    ``hf`` (default) uses HuggingFaceEmbeddings on PyTorch, ``onnx`` runs
+    the same model on ONNX Runtime and ``onnx-int8`` adds dynamic int8
+    quantization.
+    """
+    backend_name = (backend_name or os.getenv("EZ_EMBEDDING_BACKEND", "hf")).lower()
+    if backend_name == "onnx":
+        return OnnxMiniLMEmbeddings(quantize=False)
+    if backend_name in ("onnx-int8", "onnx_int8"):
+        return OnnxMiniLMEmbeddings(quantize=True)
+    if backend_name != "hf":
+        raise ValueError(f"Unknown embedding backend: {backend_name}")
+
+    from langchain.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=MODEL_NAME)
@@ -0,0 +1,83 @@
+"""Cross-session micro-batching of query embeddings.
+
+Every question embeds its query on its own, so under concurrent load the
+CPU runs many batch-of-one forward passes. MicroBatchingEmbeddings queues
+embed_query calls from all threads, waits up to ``max_wait_ms`` for more
+to arrive and embeds up to ``max_batch`` of them in one embed_documents
+call.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from langchain.embeddings.base import Embeddings
+
+from metrics import Counter, Histogram
+
+embedding_batches_total = Counter("ez_query_embedding_batches_total", "Batched query-embedding forward passes")
+batched_queries_total = Counter("ez_batched_queries_total", "Queries embedded through the micro-batcher")
+embedding_batch_size = Histogram(
+    "ez_query_embedding_batch_size", "Queries per batched forward pass", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that batches concurrent embed_query calls.
+
+    Document embedding is passed straight through, since ingestion already
+    embeds in large batches.
+    """
+
+    def __init__(self, inner, max_wait_ms=5.0, max_batch=32):
+        self.inner = inner
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._queue = []
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        future = Future()
+        with self._condition:
+            self._start_worker()
+            self._queue.append((text, future))
+            self._condition.notify_all()
+        return future.result()
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            # The first query waits at most max_wait for company
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(timeout=remaining)
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.inner.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            embedding_batches_total.inc()
+            batched_queries_total.inc(len(batch))
+            embedding_batch_size.observe(len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
@@ -0,0 +1,66 @@
+"""Extractive answers for simple lookup questions, without an LLM call.
+
+Sentences of the retrieved chunks are embedded in one batch and scored
+against the query embedding. When the best sentence is similar enough the
+top sentences are returned as the answer and as supporting quotes.
+"""
+import re
+
+# Cosine similarity (all-MiniLM-L6-v2, normalized vectors) needed to skip the LLM
+THRESHOLD = 0.62
+MAX_SENTENCES = 2
+# Sentences within this margin of the best one are included in the answer
+MARGIN = 0.05
+
+# PDF text wraps lines mid-sentence, so only blank lines end a sentence besides punctuation
+_SENTENCE = re.compile(r"(?:[^.!?\n]|\n(?!\s*\n))+(?:[.!?]+|$)")
+_LOOKUP_START = re.compile(
+    r"^\s*(?:what|which|who|when|where|how\s+(?:many|much|large|long|big)|name|list)\b", re.IGNORECASE
+)
+# Questions that need reasoning, synthesis or the conversation go to the LLM
+_NEEDS_LLM = re.compile(
+    r"\b(?:why|explain|summari[sz]e|compare|contrast|difference|differ|elaborate|expand|previous|"
+    r"earlier|above|that|those|it|implications?|opinion|think|should)\b",
+    re.IGNORECASE
+)
+
+
+def is_lookup_question(query):
+    return bool(_LOOKUP_START.match(query)) and not _NEEDS_LLM.search(query)
+
+
+def split_sentences(text, min_chars=25):
+    """Sentences of a chunk, long enough to stand alone as an answer"""
+    sentences = []
+    for match in _SENTENCE.finditer(text):
+        sentence = " ".join(match.group().split())
+        if len(sentence) >= min_chars:
+            sentences.append(sentence)
+    return sentences
+
+
+def best_sentences(embeddings, query, relevant_docs, threshold=THRESHOLD):
+    """Return (sentences, confidence); sentences is empty below the threshold"""
+    import numpy as np
+
+    candidates = []
+    seen = set()
+    for doc in relevant_docs:
+        for sentence in split_sentences(doc.page_content):
+            if sentence not in seen:
+                seen.add(sentence)
+                candidates.append(sentence)
+    if not candidates:
+        return [], 0.0
+
+    query_vector = np.asarray(embeddings.embed_query(query), dtype="float32")
+    sentence_vectors = np.asarray(embeddings.embed_documents(candidates), dtype="float32")
+    norms = np.linalg.norm(sentence_vectors, axis=1) * max(np.linalg.norm(query_vector), 1e-12)
+    scores = sentence_vectors @ query_vector / np.clip(norms, 1e-12, None)
+
+    order = np.argsort(-scores)
+    confidence = float(scores[order[0]])
+    if confidence < threshold:
+        return [], confidence
+    chosen = [candidates[i] for i in order[:MAX_SENTENCES] if scores[i] >= confidence - MARGIN]
+    return chosen, confidence
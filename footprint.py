@@ -0,0 +1,159 @@
+"""Memory accounting per pipeline stage and per session.
+
+``measure(stage)`` records how much a stage grew the process RSS and,
+with EZ_TRACEMALLOC=1, the Python allocations it left behind and its peak
+(tracemalloc slows allocation-heavy code, so it is opt-in). Results go on
+the current request's log line and into gauges.
+
+``sessions`` tracks what each UI session (keyed by its per-connection id)
+keeps alive: its share of the shared vector store, its conversation memory
+and the document text. API requests are stateless and hold nothing per
+session, so only the app reports sessions.
+Totals across sessions, and the largest single session, are exported so
+per-session limits can be chosen from real numbers.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import Gauge, current_request
+
+process_rss_bytes = Gauge("ez_process_rss_bytes", "Resident set size of this process")
+stage_rss_delta_bytes = Gauge("ez_stage_rss_delta_bytes", "RSS growth during the last run of each stage", ("stage",))
+stage_traced_bytes = Gauge(
+    "ez_stage_traced_bytes", "Python allocations during the last run of each stage (tracemalloc)", ("stage", "kind")
+)
+session_memory_bytes = Gauge(
+    "ez_session_memory_bytes", "Memory held by all tracked sessions, by component", ("component",)
+)
+session_memory_max_bytes = Gauge("ez_session_memory_max_bytes", "Memory held by the largest tracked session")
+tracked_sessions = Gauge("ez_tracked_sessions", "Sessions with a recent memory footprint")
+
+TRACEMALLOC = os.getenv("EZ_TRACEMALLOC", "0") == "1"
+SESSION_TTL_SECONDS = float(os.getenv("EZ_SESSION_FOOTPRINT_TTL", "3600"))
+# Optional per-session limit (MB) the UI warns about; 0 disables
+SESSION_LIMIT_BYTES = float(os.getenv("EZ_SESSION_MEMORY_LIMIT_MB", "0")) * 1e6
+
+COMPONENTS = ("vector_store", "conversation_memory", "file_text")
+
+# Last measurement of each stage, for report()
+_last_stages = {}
+
+
+def rss_bytes():
+    """Current resident set size; peak RSS where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextmanager
+def measure(stage):
+    """Record RSS growth (and tracemalloc allocations if enabled) of a stage"""
+    import tracemalloc
+
+    tracing = TRACEMALLOC
+    if tracing and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    # Stages in other threads share the peak, so it is an upper bound under concurrency
+    if tracing:
+        traced_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    rss_before = rss_bytes()
+    try:
+        yield
+    finally:
+        rss_after = rss_bytes()
+        process_rss_bytes.set(rss_after)
+        stage_rss_delta_bytes.set(rss_after - rss_before, stage=stage)
+        result = {"rss_delta_bytes": rss_after - rss_before}
+        _last_stages[stage] = result
+        if tracing:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            result["traced_bytes"] = traced_after - traced_before
+            result["traced_peak_bytes"] = traced_peak - traced_before
+            stage_traced_bytes.set(result["traced_bytes"], stage=stage, kind="retained")
+            stage_traced_bytes.set(result["traced_peak_bytes"], stage=stage, kind="peak")
+        record = current_request()
+        if record is not None:
+            record.setdefault("memory", {})[stage] = result
+
+
+def text_bytes(text):
+    return sys.getsizeof(text) if text is not None else 0
+
+
+class SessionFootprints:
+    """Latest memory holdings of each session, dropped after SESSION_TTL_SECONDS without updates"""
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def update(self, session_id, vector_store_bytes=0, vector_store_sessions=1, conversation_bytes=0,
+               file_text_bytes=0):
+        """Record one session's holdings; a shared vector store is split among its sessions"""
+        components = {
+            "vector_store": vector_store_bytes // max(1, vector_store_sessions),
+            "conversation_memory": conversation_bytes,
+            "file_text": file_text_bytes,
+        }
+        components["total"] = sum(components.values())
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (now, components)
+            self._expire(now)
+            self._export()
+        return components
+
+    def remove(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._export()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return dict(entry[1]) if entry is not None else None
+
+    def _expire(self, now):
+        for session_id in [s for s, (updated, _) in self._sessions.items() if now - updated > self.ttl_seconds]:
+            del self._sessions[session_id]
+
+    def _export(self):
+        for component in COMPONENTS:
+            total = sum(components[component] for _, components in self._sessions.values())
+            session_memory_bytes.set(total, component=component)
+        session_memory_max_bytes.set(max((c["total"] for _, c in self._sessions.values()), default=0))
+        tracked_sessions.set(len(self._sessions))
+
+    def report(self):
+        """Every tracked session's holdings, largest first"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return sorted(
+                ({"session_id": session_id, **components} for session_id, (_, components) in self._sessions.items()),
+                key=lambda item: item["total"],
+                reverse=True
+            )
+
+
+sessions = SessionFootprints()
+
+
+def report(include_sessions=True):
+    """Process RSS, the last measurement of each stage and (unless excluded) per-session holdings"""
+    rss = rss_bytes()
+    process_rss_bytes.set(rss)
+    result = {"rss_bytes": rss, "stages": dict(_last_stages)}
+    if include_sessions:
+        result["sessions"] = sessions.report()
+    return result
@@ -1,19 +1,99 @@
 import os
-import streamlit as st
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-
-# Set up the Groq API Key
-try:
-    os.environ["GROQ_API_KEY"] = st.secrets["GROQ_API_KEY"]
-except Exception:
-    load_dotenv()
-    os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
-
-# Use a free, production-ready model
-def get_groq_llm(model="llama-3.1-8b-instant", temperature=0.0):
+from metrics import record_tokens
+from usage import ledger
+import rate_limiter
+from rate_limiter import limiter
+from model_router import router, routed_calls_total
+
+# Heavy imports (langchain_groq, streamlit secrets) are deferred to the first
+# LLM call so importing this module is cheap
+
+# Set up the Groq API Key on first use
+_api_key_loaded = False
+
+def _ensure_api_key():
+    global _api_key_loaded
+    if _api_key_loaded:
+        return
+    try:
+        import streamlit as st
+        os.environ["GROQ_API_KEY"] = st.secrets["GROQ_API_KEY"]
+    except Exception:
+        from dotenv import load_dotenv
+        load_dotenv()
+        if os.getenv("GROQ_API_KEY"):
+            os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
+    _api_key_loaded = True
+
+# Count prompt/completion tokens reported by Groq for every call, globally
+# and in the usage ledger under the call's feature/document/session tags
+_token_usage_callback_class = None
+
+def _token_usage_callback():
+    global _token_usage_callback_class
+    if _token_usage_callback_class is None:
+        from langchain.callbacks.base import BaseCallbackHandler
+
+        class TokenUsageCallback(BaseCallbackHandler):
+            def on_llm_end(self, response, **kwargs):
+                llm_output = response.llm_output or {}
+                usage = llm_output.get("token_usage") or {}
+                prompt_tokens = usage.get("prompt_tokens", 0)
+                completion_tokens = usage.get("completion_tokens", 0)
+                record_tokens(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                # Streamed calls report no usage here; the caller accounts an estimate
+                if usage:
+                    ledger.record(prompt_tokens, completion_tokens, llm_output.get("model_name", ""))
+
+        _token_usage_callback_class = TokenUsageCallback
+    return _token_usage_callback_class()
+
+# One HTTP client for all Groq calls so every response's rate-limit
+# headers feed the shared limiter
+_http_client = None
+
+def _sync_rate_limits(response):
+    limiter.update_from_headers(response.headers)
+
+def get_http_client():
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.Client(timeout=60, event_hooks={"response": [_sync_rate_limits]})
+    return _http_client
+
+# Optional replacement for ChatGroq, e.g. a fake LLM in benchmarks
+_llm_factory = None
+
+def set_llm_factory(factory, rate_limited=False):
+    """Route get_groq_llm through factory(model=..., temperature=...); None restores Groq.
+
+    Fakes skip the rate limiter unless rate_limited, so benchmarks time the
+    backend rather than Groq's free-tier pacing.
+    """
+    global _llm_factory
+    previous, _llm_factory = _llm_factory, factory
+    limiter.enabled = rate_limiter.ENABLED and (factory is None or rate_limited)
+    return previous
+
+# Use a free, production-ready model; with EZ_MODEL_ROUTING the model is
+# picked per task and input size unless one is given
+def get_groq_llm(model=None, temperature=0.0, task="default", input_chars=0):
+    if model is None:
+        model = router.choose(task, input_chars)
+    routed_calls_total.inc(task=task, model=model)
+    if _llm_factory is not None:
+        return _llm_factory(model=model, temperature=temperature)
+    from langchain_groq import ChatGroq
+    _ensure_api_key()
     return ChatGroq(
         groq_api_key=os.environ.get("GROQ_API_KEY"),
+        # Lets load tests point at a local Groq-compatible stub server
+        groq_api_base=os.environ.get("GROQ_BASE_URL"),
         model_name=model,
-        temperature=temperature
+        temperature=temperature,
+        # Retries are handled by the rate limiter with backoff
+        max_retries=0,
+        http_client=get_http_client(),
+        callbacks=[_token_usage_callback()]
     )
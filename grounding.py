@@ -0,0 +1,150 @@
+import re
+import sys
+from array import array
+from bisect import bisect_right
+
+_TOKEN_RE = re.compile(r"\w+")
+# LLMs often elide parts of a quote; each fragment is located on its own
+_ELLIPSIS_RE = re.compile(r"\.{3,}|…")
+# Fragments shorter than one n-gram ("the", "as shown") match almost anywhere
+# and are not grounded; frequent phrases are capped per quote
+MAX_SPANS_PER_QUOTE = 10
+
+_HASH_MULTIPLIER = 1000003
+_MASK_64 = (1 << 64) - 1
+
+
+def _ngram_key(ids):
+    """64-bit rolling hash of a sequence of token ids"""
+    key = 0
+    for token_id in ids:
+        key = (key * _HASH_MULTIPLIER + token_id) & _MASK_64
+    return key
+
+
+class QuoteIndex:
+    """Word n-gram index over a whole document for grounding quotes.
+
+    Text is normalized to lowercase word tokens, so quotes that differ from
+    the document only in whitespace, casing or punctuation still match, and
+    quotes that cross chunk boundaries are found because the index covers
+    the full document rather than individual chunks.
+
+    Tokens are stored as ids in flat arrays, and every n-gram is hashed to a
+    64-bit key; the positions sorted by key form the postings, searched by
+    bisection. Collisions only add candidates, which are verified token by
+    token. That is about 24 bytes per token, so large documents fit.
+    """
+
+    def __init__(self, text, page_starts=None, ngram_size=3):
+        self.text_length = len(text)
+        self.ngram_size = ngram_size
+        self.page_starts = list(page_starts or [0])
+
+        self.vocabulary = {}
+        self.token_ids = array("I")
+        self.token_starts = array("I")
+        self.token_ends = array("I")
+        for match in _TOKEN_RE.finditer(text):
+            self.token_ids.append(self.vocabulary.setdefault(match.group().lower(), len(self.vocabulary)))
+            self.token_starts.append(match.start())
+            self.token_ends.append(match.end())
+        self._build_postings()
+
+    def _build_postings(self):
+        import numpy as np
+
+        ids = np.frombuffer(self.token_ids, dtype=np.uint32).astype(np.uint64)
+        count = max(0, len(ids) - self.ngram_size + 1)
+        # Same rolling hash as _ngram_key; uint64 arithmetic wraps like the mask there
+        keys = np.zeros(count, dtype=np.uint64)
+        for offset in range(self.ngram_size):
+            keys = keys * np.uint64(_HASH_MULTIPLIER) + ids[offset:offset + count]
+        order = np.argsort(keys, kind="stable")
+        self.ngram_keys = keys[order]
+        self.ngram_positions = order.astype(np.uint32)
+
+    def __setstate__(self, state):
+        # Indexes pickled before array-backed postings keep string tokens and a dict of lists
+        if "postings" in state:
+            tokens = state.pop("tokens")
+            del state["postings"]
+            self.__dict__.update(state)
+            self.vocabulary = {}
+            self.token_ids = array("I", (self.vocabulary.setdefault(t, len(self.vocabulary)) for t in tokens))
+            self.token_starts = array("I", state["token_starts"])
+            self.token_ends = array("I", state["token_ends"])
+            self._build_postings()
+        else:
+            self.__dict__.update(state)
+
+    def _postings(self, ids):
+        """(first, last) slice of ngram_positions whose n-gram hashes like ids"""
+        import numpy as np
+
+        key = np.uint64(_ngram_key(ids))
+        return (int(np.searchsorted(self.ngram_keys, key, side="left")),
+                int(np.searchsorted(self.ngram_keys, key, side="right")))
+
+    def _candidates(self, query_ids):
+        n = self.ngram_size
+        # Anchor on the rarest n-gram of the quote to verify few candidates
+        best_offset, best = 0, None
+        for offset in range(len(query_ids) - n + 1):
+            first, last = self._postings(query_ids[offset:offset + n])
+            if first == last:
+                return []
+            if best is None or last - first < best[1] - best[0]:
+                best_offset, best = offset, (first, last)
+        positions = self.ngram_positions[best[0]:best[1]].tolist()
+        return sorted(p - best_offset for p in positions if p >= best_offset)
+
+    def _locate_fragment(self, fragment):
+        query_tokens = [t.lower() for t in _TOKEN_RE.findall(fragment)]
+        if len(query_tokens) < self.ngram_size:
+            return []
+        # A word the document never uses cannot match
+        if any(t not in self.vocabulary for t in query_tokens):
+            return []
+        query_ids = array("I", (self.vocabulary[t] for t in query_tokens))
+
+        length = len(query_ids)
+        spans = []
+        for position in self._candidates(query_ids):
+            if self.token_ids[position:position + length] == query_ids:
+                spans.append((
+                    self.token_starts[position],
+                    self.token_ends[position + length - 1]
+                ))
+        return spans
+
+    def locate(self, quote, max_spans=MAX_SPANS_PER_QUOTE):
+        """Return the first max_spans (start, end) character spans of quote in the document"""
+        spans = []
+        for fragment in _ELLIPSIS_RE.split(quote or ""):
+            spans.extend(self._locate_fragment(fragment))
+        return sorted(spans)[:max_spans]
+
+    def locate_all(self, quotes):
+        """Map each quote to its list of spans"""
+        return {quote: self.locate(quote) for quote in quotes}
+
+    def memory_bytes(self):
+        """Measured bytes of the token arrays, the vocabulary and the n-gram postings"""
+        total = sys.getsizeof(self.vocabulary) + sum(sys.getsizeof(word) for word in self.vocabulary)
+        total += sum(sys.getsizeof(values) for values in (self.token_ids, self.token_starts, self.token_ends))
+        total += self.ngram_keys.nbytes + self.ngram_positions.nbytes
+        return total
+
+    def page_of(self, offset):
+        """1-based page number containing a character offset"""
+        return bisect_right(self.page_starts, offset)
+
+
+def spans_within(spans, start, end):
+    """Clip document spans to [start, end) and make them chunk-relative"""
+    clipped = []
+    for span_start, span_end in spans:
+        if span_start < end and span_end > start:
+            clipped.append((max(span_start, start) - start, min(span_end, end) - start))
+    return clipped
@@ -0,0 +1,108 @@
+import html
+import re
+from functools import lru_cache
+
+
+# Compiled patterns are reused across reruns, since Streamlit re-renders the
+# same sources with the same quotes many times.
+@lru_cache(maxsize=256)
+def _compile_phrases(phrases, flags=0):
+    """Build one alternation over all phrases.
+
+    Phrases are sorted longest first so that, at any position, the longest
+    phrase starting there wins.
+    """
+    alternatives = []
+    for phrase in sorted(phrases, key=len, reverse=True):
+        # Any run of whitespace in the phrase matches any run in the text
+        words = [re.escape(word) for word in phrase.split()]
+        alternatives.append(r"\s+".join(words))
+    return re.compile("|".join(alternatives), flags)
+
+
+def _normalize_phrases(phrases):
+    return tuple(sorted({p.strip() for p in phrases if p and p.strip()}))
+
+
+def merge_spans(spans):
+    """Merge overlapping or touching (start, end) spans"""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def find_phrase_spans(text, phrases):
+    """Find every case-insensitive occurrence of any phrase in one pass.
+
+    Returns merged (start, end) character spans into ``text``.
+    """
+    phrases = _normalize_phrases(phrases or [])
+    if not text or not phrases:
+        return []
+
+    # Matching a lowercased copy without IGNORECASE is several times faster,
+    # but only valid when lowercasing keeps every character offset in place
+    haystack = text.lower()
+    if len(haystack) == len(text):
+        pattern = _compile_phrases(tuple(p.lower() for p in phrases))
+    else:
+        haystack = text
+        pattern = _compile_phrases(phrases, re.IGNORECASE)
+
+    spans = []
+    position = 0
+    while True:
+        match = pattern.search(haystack, position)
+        if match is None:
+            break
+        spans.append(match.span())
+        # Resume just after the match start so overlapping phrases are found
+        position = match.start() + 1
+    return merge_spans(spans)
+
+
+def apply_spans(text, spans, open_tag="**", close_tag="**", escape=None):
+    """Wrap each span of text in open/close tags, escaping the rest if asked"""
+    escape = escape or (lambda s: s)
+    parts = []
+    position = 0
+    for start, end in merge_spans(spans):
+        start = max(start, position)
+        end = min(end, len(text))
+        if start >= end:
+            continue
+        parts.append(escape(text[position:start]))
+        parts.append(open_tag + escape(text[start:end]) + close_tag)
+        position = end
+    parts.append(escape(text[position:]))
+    return "".join(parts)
+
+
+def highlight_text(text, phrases_to_highlight, open_tag="**", close_tag="**"):
+    """Highlight specific phrases in text, keeping the text's original casing"""
+    spans = find_phrase_spans(text, phrases_to_highlight)
+    if not spans:
+        return text
+    return apply_spans(text, spans, open_tag, close_tag)
+
+
+def highlight_html(text, phrases_to_highlight=None, spans=None, css_class="highlight"):
+    """Return HTML-escaped text with matches wrapped in highlight spans.
+
+    Pass ``spans`` to highlight known character ranges directly instead of
+    searching for phrases.
+    """
+    if spans is None:
+        spans = find_phrase_spans(text, phrases_to_highlight)
+    return apply_spans(
+        text,
+        spans,
+        open_tag=f'<span class="{css_class}">',
+        close_tag="</span>",
+        escape=html.escape
+    )
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+
+from metrics import cache_hits_total, cache_misses_total
+
+# Vector store methods that would change a shared index
+_MUTATING_METHODS = {
+    "add_texts", "add_documents", "add_embeddings", "aadd_texts",
+    "aadd_documents", "delete", "adelete", "merge_from", "save_local"
+}
+
+
+def document_hash(text):
+    """Content hash used to share one index between sessions"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def index_memory_report(store):
+    """Approximate resident bytes of a FAISS store, split by component"""
+    from compact_store import vector_bytes, vector_storage_name
+
+    index = getattr(store, "index", None)
+    report = {
+        "chunks": getattr(index, "ntotal", 0),
+        "vector_storage": vector_storage_name(index),
+        "vector_bytes": vector_bytes(index),
+        "docstore_bytes": 0,
+        "quote_index_bytes": 0,
+    }
+
+    docstore = getattr(store, "docstore", None)
+    if hasattr(docstore, "memory_bytes"):
+        report["docstore_bytes"] = docstore.memory_bytes()
+    else:
+        for doc in getattr(docstore, "_dict", {}).values():
+            report["docstore_bytes"] += sys.getsizeof(doc.page_content) + sys.getsizeof(doc.metadata)
+
+    quote_index = getattr(store, "quote_index", None)
+    if quote_index is not None:
+        report["quote_index_bytes"] = quote_index.memory_bytes()
+
+    report["total_bytes"] = report["vector_bytes"] + report["docstore_bytes"] + report["quote_index_bytes"]
+    return report
+
+
+def estimate_index_bytes(store):
+    """Approximate resident bytes of a FAISS store, its docstore and quote index"""
+    return index_memory_report(store)["total_bytes"]
+
+
+class SharedIndexHandle:
+    """Read-only view of a shared vector store.
+
+    Reads are forwarded to the underlying store; methods that would mutate
+    it raise, since other sessions are using the same index.
+    """
+
+    def __init__(self, entry, doc_hash):
+        self._entry = entry
+        self.doc_hash = doc_hash
+
+    def __getattr__(self, name):
+        if name in _MUTATING_METHODS:
+            raise AttributeError(f"Shared index is read-only: {name} is not allowed")
+        store = self._entry.store
+        if store is None:
+            raise RuntimeError(f"Index {self.doc_hash[:12]} has been released")
+        return getattr(store, name)
+
+
+class _Entry:
+    def __init__(self):
+        self.store = None
+        self.error = None
+        self.ready = threading.Event()
+        self.holders = {}
+        self.resident_bytes = 0
+        self.memory = {}
+        self.created_at = time.time()
+
+
+class IndexRegistry:
+    """Process-wide, reference-counted registry of vector indexes.
+
+    Indexes are keyed by document hash. Each session holds a reference
+    until it releases it or stops touching the index for ``idle_timeout``
+    seconds; an index is freed as soon as it has no holders.
+    """
+
+    def __init__(self, idle_timeout=1800):
+        self.idle_timeout = idle_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def acquire(self, doc_hash, session_id, builder):
+        """Return a shared handle for doc_hash, building it with builder() once"""
+        self._start_sweeper()
+        with self._lock:
+            entry = self._entries.get(doc_hash)
+            build = entry is None
+            if build:
+                entry = _Entry()
+                self._entries[doc_hash] = entry
+                self.misses += 1
+                cache_misses_total.inc(cache="vector_index")
+            else:
+                self.hits += 1
+                cache_hits_total.inc(cache="vector_index")
+            entry.holders[session_id] = time.time()
+
+        if build:
+            try:
+                entry.store = builder()
+                entry.memory = index_memory_report(entry.store)
+                entry.resident_bytes = entry.memory["total_bytes"]
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    self._entries.pop(doc_hash, None)
+                raise
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+
+        return SharedIndexHandle(entry, doc_hash)
+
+    def touch(self, doc_hash, session_id):
+        """Mark a session as still using an index"""
+        with self._lock:
+            entry = self._entries.get(doc_hash)
+            if entry is not None and session_id in entry.holders:
+                entry.holders[session_id] = time.time()
+                return True
+            return False
+
+    def release(self, doc_hash, session_id):
+        """Drop a session's reference, freeing the index if it was the last"""
+        with self._lock:
+            entry = self._entries.get(doc_hash)
+            if entry is None:
+                return
+            entry.holders.pop(session_id, None)
+            if not entry.holders and entry.ready.is_set():
+                self._evict(doc_hash)
+
+    def sweep(self):
+        """Drop holders idle longer than idle_timeout and free orphaned indexes"""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            for doc_hash, entry in list(self._entries.items()):
+                if not entry.ready.is_set():
+                    continue
+                for session_id, last_seen in list(entry.holders.items()):
+                    if last_seen < cutoff:
+                        del entry.holders[session_id]
+                if not entry.holders:
+                    self._evict(doc_hash)
+
+    def _evict(self, doc_hash):
+        entry = self._entries.pop(doc_hash)
+        # Stale handles still point at the entry; dropping the store frees it
+        entry.store = None
+        print(f"🧹 Freed shared index {doc_hash[:12]} ({entry.resident_bytes / 1e6:.1f} MB)")
+
+    def _start_sweeper(self):
+        if self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(max(1, self.idle_timeout / 4))
+                    self.sweep()
+
+            self._sweeper = threading.Thread(target=run, name="index-registry-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def memory_report(self):
+        """Resident memory and holders for every index currently loaded"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "doc_hash": doc_hash,
+                    "sessions": len(entry.holders),
+                    "resident_bytes": entry.resident_bytes,
+                    "memory": entry.memory,
+                    "idle_seconds": now - max(entry.holders.values(), default=entry.created_at)
+                }
+                for doc_hash, entry in self._entries.items()
+                if entry.ready.is_set()
+            ]
+
+    def total_resident_bytes(self):
+        return sum(item["resident_bytes"] for item in self.memory_report())
+
+
+registry = IndexRegistry(idle_timeout=float(os.getenv("EZ_INDEX_IDLE_TIMEOUT", "1800")))
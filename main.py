@@ -1,16 +1,23 @@
 import streamlit as st
 import os
 from backend import (
-    prepare_vector_store,
-    summarize_document,
+    load_or_prepare_vector_store,
+    get_document_summary,
     qa_chain,
     qa_chain_with_highlighting,  # New enhanced function
     generate_logic_questions,
     evaluate_user_response,
     get_conversational_chain,
-    EnhancedConversationalChain,  # New enhanced class
-    highlight_text  # New highlighting utility
+    EnhancedConversationalChain  # New enhanced class
 )
+from highlighting import highlight_html
+from utils import extract_uploaded_file
+from index_registry import registry as index_registry, document_hash
+from metrics import span, start_metrics_server
+from conversation_store import get_conversation_store
+import usage
+import profiling
+import footprint
 
 # Page Configuration
 st.set_page_config(
@@ -20,6 +27,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Expose /metrics when EZ_METRICS_PORT is set (started once per process)
+start_metrics_server()
+
+# ?profile=sample (or cprofile) in the URL profiles this session's backend calls
+profiling.bind(st.query_params.get("profile"))
+
 # Secure API key loading
 try:
     os.environ["GROQ_API_KEY"] = st.secrets["GROQ_API_KEY"]
@@ -33,24 +46,60 @@ except:
 
 # File reading logic with error handling
 def read_file(uploaded_file):
+    with span("extract"), footprint.measure("extract"):
+        return _read_file(uploaded_file)
+
+def _read_file(uploaded_file):
     try:
-        if uploaded_file.type == "application/pdf":
-            import fitz  # PyMuPDF
-            pdf_document = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-            text = ""
-            for page in pdf_document:
-                text += page.get_text() + "\n"
-            pdf_document.close()
-            return text
-        elif uploaded_file.type == "text/plain":
-            return str(uploaded_file.read(), "utf-8")
-        else:
-            st.error("Unsupported file format. Please upload PDF or TXT files only.")
-            return ""
+        text, page_starts = extract_uploaded_file(uploaded_file)
+        st.session_state.page_starts = page_starts
+        return text
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
         return ""
 
+# Per-connection id: holds shared indexes and tags token usage and memory.
+# Never read from the URL, so tabs opened from one link don't share it
+def get_session_id():
+    if "session_id" not in st.session_state:
+        import uuid
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+# Random key of this browser's stored conversations, kept in the URL
+# (?history=...) so a reload or server restart finds them. It is only used
+# by the conversation store: anyone with the full URL can read the history
+def get_history_key():
+    if "history_key" not in st.session_state:
+        key = st.query_params.get("history")
+        if not key or len(key) < 32:
+            import secrets
+            key = secrets.token_urlsafe(32)
+            st.query_params["history"] = key
+        st.session_state.history_key = key
+    return st.session_state.history_key
+
+# Stored Memory Chat exchanges for this session and document
+def conversation_count():
+    if not st.session_state.get("document_hash"):
+        return 0
+    return get_conversation_store().count(get_history_key(), st.session_state.document_hash)
+
+def clear_conversation():
+    if st.session_state.get("document_hash"):
+        get_conversation_store().clear(get_history_key(), st.session_state.document_hash)
+
+def choose_suggestion(question):
+    st.session_state.chosen_suggestion = question
+
+# Hand the shared index back to the registry when the session moves on
+def release_vector_store():
+    if st.session_state.get("document_hash"):
+        index_registry.release(st.session_state.document_hash, get_session_id())
+    st.session_state.document_hash = None
+    st.session_state.vector_store = None
+    footprint.sessions.remove(get_session_id())
+
 # Enhanced Custom CSS for better UI
 def load_custom_css():
     st.markdown("""
@@ -355,14 +404,15 @@ def display_enhanced_answer(result):
                 f"📄 Source {i} " + (f"({relevance_score} matches)" if relevance_score > 0 else ""), 
                 expanded=(i == 1)  # Expand first source by default
             ):
-                # Highlight the relevant parts
-                highlighted_content = highlight_text(
-                    source["content"], 
-                    source.get("highlighted_parts", [])
-                )
-                
-                # Convert markdown bold to HTML highlighting
-                highlighted_content = highlighted_content.replace('**', '<span class="highlight">').replace('**', '</span>')
+                # Highlight the relevant parts as escaped HTML in one pass,
+                # using grounded quote spans when the backend found them
+                if source.get("highlight_spans"):
+                    highlighted_content = highlight_html(source["content"], spans=source["highlight_spans"])
+                else:
+                    highlighted_content = highlight_html(
+                        source["content"], 
+                        source.get("highlighted_parts", [])
+                    )
                 
                 # Display with custom styling
                 st.markdown(f"""
@@ -376,28 +426,30 @@ def display_enhanced_answer(result):
                 # Show metadata
                 if source.get("metadata"):
                     metadata = source["metadata"]
-                    st.caption(f"📊 Chunk ID: {metadata.get('chunk_id', 'N/A')} | Length: {metadata.get('chunk_length', 'N/A')} chars")
+                    st.caption(f"📊 Chunk ID: {metadata.get('chunk_id', 'N/A')} | Page: {metadata.get('page', 'N/A')} | Section: {metadata.get('section') or 'N/A'} | Length: {metadata.get('chunk_length', 'N/A')} chars")
 
 # Memory context display
 def display_memory_context(conversation_chain):
     """Display conversation memory context"""
-    if hasattr(conversation_chain, 'memory') and conversation_chain.memory.chat_memory.messages:
-        messages = conversation_chain.memory.chat_memory.messages
-        if messages:
-            st.markdown("""
-            <div class="memory-indicator">
-                🧠 <strong>Memory Active:</strong> I can reference our previous conversation.
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Show memory stats
-            num_qa_pairs = len(messages) // 2
-            st.caption(f"💭 Remembering {num_qa_pairs} previous Q&A pairs")
+    if hasattr(conversation_chain, 'memory') and conversation_chain.memory.turn_count:
+        memory = conversation_chain.memory
+        st.markdown("""
+        <div class="memory-indicator">
+            🧠 <strong>Memory Active:</strong> I can reference our previous conversation.
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Show memory stats
+        num_qa_pairs = memory.turn_count
+        summarized = " (older turns summarized)" if memory.summary else ""
+        st.caption(f"💭 Remembering {num_qa_pairs} previous Q&A pairs{summarized} | {memory.bytes_held() / 1024:.1f} KB held")
 
 # Display conversation history
-def display_conversation_history(conversation_history, show_all=False, max_recent=3):
-    """Display formatted conversation history with configurable options"""
-    if conversation_history:
+def display_conversation_history(history_key, doc_hash, page_size=5):
+    """Display stored conversation history one page at a time"""
+    store = get_conversation_store()
+    total = store.count(history_key, doc_hash) if doc_hash else 0
+    if total:
         st.markdown("""
         <div style="background: linear-gradient(135deg, #f3e5f5 0%, #e1bee7 100%); 
                     padding: 1.5rem; border-radius: 12px; margin: 1rem 0;
@@ -406,30 +458,21 @@ def display_conversation_history(conversation_history, show_all=False, max_recen
         </div>
         """, unsafe_allow_html=True)
         
-        # User control for display options
+        # Only the selected page is read from the store and rendered
         col1, col2 = st.columns(2)
         with col1:
-            show_all_toggle = st.checkbox("Show all conversations", value=show_all)
+            page_size = st.slider("Conversations per page", 1, 20, page_size)
+        page_count = (total + page_size - 1) // page_size
         with col2:
-            if not show_all_toggle:
-                max_display = st.slider("Recent conversations to show", 1, 10, max_recent)
-        
-        # Determine which conversations to show
-        if show_all_toggle:
-            conversations_to_show = conversation_history
-            start_index = 1
-        else:
-            conversations_to_show = conversation_history[-max_display:]
-            start_index = max(1, len(conversation_history) - max_display + 1)
+            page = st.number_input("Page (1 = most recent)", min_value=1, max_value=page_count, value=1) - 1
+        conversations_to_show = store.page(history_key, doc_hash, page, page_size)
         
         # Show total count
-        st.caption(f"📊 Total conversations: {len(conversation_history)} | Showing: {len(conversations_to_show)}")
+        st.caption(f"📊 Total conversations: {total} | Showing: {len(conversations_to_show)} | Page {page + 1} of {page_count}")
         
         # Display conversations
-        for i, chat in enumerate(conversations_to_show):
-            actual_index = start_index + i
-            
-            with st.expander(f"💬 Exchange {actual_index}", expanded=False):
+        for chat in conversations_to_show:
+            with st.expander(f"💬 Exchange {chat['index']}", expanded=False):
                 st.markdown(f"""
                 <div class="conversation-bubble">
                     <strong>Q:</strong> {chat['question']}<br><br>
@@ -465,10 +508,10 @@ if "question_generation_attempts" not in st.session_state:
     st.session_state.question_generation_attempts = 0
 if "conversation_chain" not in st.session_state:
     st.session_state.conversation_chain = None
-if "conversation_history" not in st.session_state:
-    st.session_state.conversation_history = []
 if "vector_store" not in st.session_state:
     st.session_state.vector_store = None
+if "document_hash" not in st.session_state:
+    st.session_state.document_hash = None
 if "current_memory_result" not in st.session_state:
     st.session_state.current_memory_result = None
 if "current_memory_question" not in st.session_state:
@@ -497,7 +540,7 @@ with st.sidebar:
     
     # Memory status
     if st.session_state.conversation_chain:
-        memory_length = len(st.session_state.conversation_chain.memory.chat_memory.messages)
+        memory_length = st.session_state.conversation_chain.memory.turn_count * 2
         
         # Stats display
         st.markdown(f"""
@@ -511,13 +554,54 @@ with st.sidebar:
         
         if st.button("🗑️ Clear Memory", use_container_width=True):
             st.session_state.conversation_chain.clear_memory()
-            st.session_state.conversation_history = []
+            clear_conversation()
             if 'current_memory_result' in st.session_state:
                 del st.session_state.current_memory_result
             if 'current_memory_question' in st.session_state:
                 del st.session_state.current_memory_question
             st.success("Memory cleared!")
             st.rerun()
+        
+        prefetcher = st.session_state.conversation_chain.prefetcher
+        if prefetcher is not None and prefetcher.lookups:
+            st.caption(
+                f"⚡ Prefetch hit rate: {prefetcher.hit_rate():.0%} "
+                f"({prefetcher.hits}/{prefetcher.lookups}) | Tokens left: {prefetcher.tokens_left}"
+            )
+    
+    # LLM tokens spent by this session (this worker only)
+    session_usage = usage.ledger.report(session_id=get_session_id())
+    if session_usage["features"]:
+        st.caption(
+            f"🪙 Tokens: {session_usage['prompt_tokens'] + session_usage['completion_tokens']:,} "
+            f"(≈${session_usage['cost_usd']:.4f}) | Budget: {session_usage['level']}"
+        )
+    
+    # This session's memory as of the last run
+    session_memory = footprint.sessions.get(get_session_id())
+    if session_memory:
+        st.caption(
+            f"🧮 Session memory: {session_memory['total'] / 1e6:.1f} MB "
+            f"(index share {session_memory['vector_store'] / 1e6:.1f} | chat {session_memory['conversation_memory'] / 1e6:.2f} "
+            f"| text {session_memory['file_text'] / 1e6:.1f})"
+        )
+        if footprint.SESSION_LIMIT_BYTES and session_memory["total"] > footprint.SESSION_LIMIT_BYTES:
+            st.warning("This session is over the per-session memory limit; clearing memory or closing the document frees it.")
+    
+    # Shared index memory for the current document
+    if st.session_state.document_hash:
+        for index_info in index_registry.memory_report():
+            if index_info["doc_hash"] == st.session_state.document_hash:
+                memory = index_info["memory"]
+                st.caption(
+                    f"📦 Index memory: {index_info['resident_bytes'] / 1e6:.1f} MB "
+                    f"| Shared by {index_info['sessions']} session(s)"
+                )
+                st.caption(
+                    f"Vectors ({memory.get('vector_storage', 'float32')}): {memory.get('vector_bytes', 0) / 1e6:.2f} MB "
+                    f"| Text: {memory.get('docstore_bytes', 0) / 1e6:.2f} MB "
+                    f"| Quotes: {memory.get('quote_index_bytes', 0) / 1e6:.2f} MB"
+                )
     
     # Display settings
     st.markdown("### ⚙️ Display Settings")
@@ -574,7 +658,7 @@ with col2:
         st.markdown(f"""
         <div class="stats-container">
             <div class="stat-card">
-                <div class="stat-number">{len(st.session_state.conversation_history)}</div>
+                <div class="stat-number">{conversation_count()}</div>
                 <div class="stat-label">Questions Asked</div>
             </div>
         </div>
@@ -586,6 +670,9 @@ if uploaded_file:
         file_text = read_file(uploaded_file)
 
     if file_text and len(file_text.strip()) > 0:
+        # Token usage and budgets for this run are tracked per session and document
+        usage.bind(session_id=get_session_id(), doc_hash=document_hash(file_text))
+        
         # Check if this is a new document
         if st.session_state.current_document != uploaded_file.name:
             st.session_state.current_document = uploaded_file.name
@@ -593,8 +680,7 @@ if uploaded_file:
             st.session_state.questions_loaded = False
             st.session_state.question_generation_attempts = 0
             st.session_state.conversation_chain = None
-            st.session_state.conversation_history = []
-            st.session_state.vector_store = None
+            release_vector_store()
             if 'current_memory_result' in st.session_state:
                 del st.session_state.current_memory_result
             if 'current_memory_question' in st.session_state:
@@ -630,7 +716,7 @@ if uploaded_file:
         # Auto Summary
         with st.spinner("🤖 Generating intelligent summary..."):
             try:
-                summary = summarize_document(file_text)
+                summary = get_document_summary(file_text)
                 st.markdown("""
                 <div style="background: linear-gradient(135deg, #fff3e0 0%, #ffe0b2 100%); 
                             padding: 1.5rem; border-radius: 12px; margin: 1rem 0;
@@ -647,11 +733,24 @@ if uploaded_file:
                 """, unsafe_allow_html=True)
                 summary = "Summary generation failed."
 
-        # Prepare vector store once
+        # Keep our reference to the shared index alive across reruns
+        if st.session_state.vector_store is not None:
+            if not index_registry.touch(st.session_state.document_hash, get_session_id()):
+                # Released after an idle timeout; acquire it again below
+                st.session_state.vector_store = None
+
+        # Prepare vector store once, shared by every session reading the same document
         if st.session_state.vector_store is None:
             with st.spinner("🔍 Preparing document for intelligent search..."):
                 try:
-                    vector_store = prepare_vector_store(file_text)
+                    doc_hash = document_hash(file_text)
+                    page_starts = st.session_state.get("page_starts")
+                    vector_store = index_registry.acquire(
+                        doc_hash,
+                        get_session_id(),
+                        lambda: load_or_prepare_vector_store(file_text, page_starts, doc_hash)
+                    )
+                    st.session_state.document_hash = doc_hash
                     st.session_state.vector_store = vector_store
                     st.markdown("""
                     <div class="success-message">
@@ -661,7 +760,17 @@ if uploaded_file:
                     
                     # Initialize enhanced conversation chain
                     if st.session_state.conversation_chain is None:
-                        st.session_state.conversation_chain = EnhancedConversationalChain(vector_store)
+                        st.session_state.conversation_chain = EnhancedConversationalChain(
+                            vector_store, document_summary=summary
+                        )
+                        # Pick up where a stored conversation left off
+                        chain = st.session_state.conversation_chain
+                        chain.restore_turns(
+                            get_conversation_store().recent_turns(get_history_key(), doc_hash, chain.memory.max_turns)
+                        )
+                    else:
+                        st.session_state.conversation_chain.vector_store = vector_store
+                        st.session_state.conversation_chain.document_summary = summary
                     
                 except Exception as e:
                     st.markdown(f"""
@@ -671,6 +780,21 @@ if uploaded_file:
                     """, unsafe_allow_html=True)
                     st.stop()
 
+        # What this session keeps alive: its share of the shared index, chat memory and the text
+        index_info = next(
+            (info for info in index_registry.memory_report() if info["doc_hash"] == st.session_state.document_hash),
+            None
+        )
+        footprint.sessions.update(
+            get_session_id(),
+            vector_store_bytes=index_info["resident_bytes"] if index_info else 0,
+            vector_store_sessions=index_info["sessions"] if index_info else 1,
+            conversation_bytes=(
+                st.session_state.conversation_chain.memory_bytes() if st.session_state.conversation_chain else 0
+            ),
+            file_text_bytes=footprint.text_bytes(file_text)
+        )
+
         # Interaction modes with enhanced styling
         st.markdown("---")
         st.markdown("""
@@ -730,37 +854,51 @@ if uploaded_file:
             user_question = st.text_input("Enter your question (can refer to previous answers):", 
                                         placeholder="Can you expand on that previous point?")
             
+            # Follow-ups predicted (and prefetched) after the last answer. They
+            # arrive asynchronously, so each button is keyed by its text and
+            # carries the question it showed when rendered
+            asked_question = st.session_state.pop("chosen_suggestion", None)
+            suggestions = st.session_state.conversation_chain.suggested_questions()
+            if suggestions:
+                st.caption("💡 Suggested follow-ups")
+                for suggestion in suggestions:
+                    st.button(suggestion, key=f"suggestion_{suggestion}", on_click=choose_suggestion,
+                              args=(suggestion,))
+            
             col1, col2 = st.columns([3, 1])
             
             with col1:
-                if st.button("💬 Ask Question", type="primary", use_container_width=True):
-                    if user_question:
-                        with st.spinner("🤖 Processing with memory context..."):
-                            try:
-                                # Use enhanced conversational chain
-                                result = st.session_state.conversation_chain.ask_question(user_question)
-                                
-                                # Store the current result to display
-                                st.session_state.current_memory_result = result
-                                st.session_state.current_memory_question = user_question
-                                
-                                # Add to display history
-                                st.session_state.conversation_history.append({
-                                    "question": user_question,
-                                    "answer": result["answer"],
-                                    "supporting_quotes": result.get("supporting_quotes", []),
-                                    "highlighted_sources": result.get("highlighted_sources", [])
-                                })
-                                
-                                st.rerun()
-                                
-                            except Exception as e:
-                                st.error(f"Error in memory chat: {str(e)}")
+                if st.button("💬 Ask Question", type="primary", use_container_width=True) and user_question:
+                    asked_question = user_question
+            
+            if asked_question:
+                with st.spinner("🤖 Processing with memory context..."):
+                    try:
+                        # Use enhanced conversational chain
+                        result = st.session_state.conversation_chain.ask_question(asked_question)
+                        
+                        # Store the current result to display
+                        st.session_state.current_memory_result = result
+                        st.session_state.current_memory_question = asked_question
+                        
+                        # Append to the persistent history
+                        get_conversation_store().append(
+                            get_history_key(),
+                            st.session_state.document_hash,
+                            asked_question,
+                            result["answer"],
+                            result.get("supporting_quotes", [])
+                        )
+                        
+                        st.rerun()
+                        
+                    except Exception as e:
+                        st.error(f"Error in memory chat: {str(e)}")
             
             with col2:
                 if st.button("🗑️ Clear Chat"):
                     st.session_state.conversation_chain.clear_memory()
-                    st.session_state.conversation_history = []
+                    clear_conversation()
                     if 'current_memory_result' in st.session_state:
                         del st.session_state.current_memory_result
                     if 'current_memory_question' in st.session_state:
@@ -776,7 +914,7 @@ if uploaded_file:
                 st.markdown("---")
             
             # Display conversation history
-            display_conversation_history(st.session_state.conversation_history)
+            display_conversation_history(get_history_key(), st.session_state.document_hash)
 
         elif mode == "Challenge Me":
             st.subheader("🧠 Challenge Me")
@@ -885,8 +1023,7 @@ else:
         st.session_state.questions_loaded = False
         st.session_state.question_generation_attempts = 0
         st.session_state.conversation_chain = None
-        st.session_state.conversation_history = []
-        st.session_state.vector_store = None
+        release_vector_store()
         if 'current_memory_result' in st.session_state:
             del st.session_state.current_memory_result
         if 'current_memory_question' in st.session_state:
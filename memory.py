@@ -0,0 +1,113 @@
+import contextvars
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# One background worker is enough: summaries are small and only need to be
+# ready by the next question, not immediately
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+
+def _fallback_summary(previous_summary, turns, max_chars):
+    """Cheap summary used when no LLM summarizer is available or it fails"""
+    lines = [previous_summary] if previous_summary else []
+    for question, answer in turns:
+        first_sentence = answer.split(". ")[0].strip()
+        lines.append(f"Q: {question.strip()} A: {first_sentence}")
+    summary = "\n".join(lines)
+    # Keep the most recent part when over budget
+    return summary[-max_chars:]
+
+
+class BoundedConversationMemory:
+    """Ring-buffer conversation memory with a rolling summary.
+
+    The last ``max_turns`` question/answer pairs are kept verbatim. Older
+    turns are folded into a short summary by ``summarizer`` on a background
+    thread, so asking a question never waits for summarization.
+    """
+
+    def __init__(self, max_turns=2, summarizer=None, max_summary_chars=2000):
+        self.max_turns = max_turns
+        self.summarizer = summarizer
+        self.max_summary_chars = max_summary_chars
+        self.turns = deque()
+        self.summary = ""
+        self.turn_count = 0
+        self._pending = []
+        self._summary_future = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def add_turn(self, question, answer):
+        """Record a question/answer pair, rolling the oldest into the summary"""
+        with self._lock:
+            self.turns.append((question, answer))
+            self.turn_count += 1
+            while len(self.turns) > self.max_turns:
+                self._pending.append(self.turns.popleft())
+            if self._pending and self._summary_future is None:
+                # Run in a copy of the caller's context so usage tags follow the summary call
+                self._summary_future = _summary_executor.submit(
+                    contextvars.copy_context().run, self._summarize, self._generation
+                )
+
+    def _summarize(self, generation):
+        while True:
+            with self._lock:
+                # A cleared memory has already dropped its reference to us
+                if generation != self._generation:
+                    return
+                if not self._pending:
+                    self._summary_future = None
+                    return
+                turns, self._pending = self._pending, []
+                previous_summary = self.summary
+
+            try:
+                if self.summarizer is None:
+                    raise ValueError("No summarizer configured")
+                summary = self.summarizer(previous_summary, turns).strip()
+            except Exception as e:
+                print(f"⚠️ Conversation summary failed, using fallback: {e}")
+                summary = _fallback_summary(previous_summary, turns, self.max_summary_chars)
+
+            with self._lock:
+                # Memory was cleared while we were summarizing
+                if generation != self._generation:
+                    return
+                self.summary = summary[:self.max_summary_chars]
+
+    def get_context(self):
+        """Render the summary and recent turns as prompt context"""
+        with self._lock:
+            parts = []
+            if self.summary:
+                parts.append(f"Summary of earlier conversation: {self.summary}")
+            for question, answer in self.turns:
+                parts.append(f"Previous Q: {question}")
+                parts.append(f"Previous A: {answer}")
+            return "\n".join(parts)
+
+    def recent_turns(self):
+        """Verbatim question/answer pairs still held in the ring buffer"""
+        with self._lock:
+            return [{"question": q, "answer": a} for q, a in self.turns]
+
+    def bytes_held(self):
+        """Approximate bytes held by this session's conversation memory"""
+        with self._lock:
+            strings = [self.summary]
+            for turn in list(self.turns) + self._pending:
+                strings.extend(turn)
+            return sum(sys.getsizeof(s) for s in strings)
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear()
+            self._pending = []
+            self.summary = ""
+            self.turn_count = 0
+            self._summary_future = None
+            self._generation += 1
@@ -0,0 +1,274 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Structured request logs go to stderr as one JSON object per line
+logger = logging.getLogger("ez_genai.requests")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_registry = []
+_current_request = contextvars.ContextVar("ez_current_request", default=None)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    rendered = ",".join(f'{name}="{value}"' for name, value in pairs)
+    return "{" + rendered + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, [("le", bound)])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {state['count']}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {state['sum']}")
+                lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+# Pipeline metrics shared by backend, groq_llm and the index registry
+stage_seconds = Histogram("ez_stage_seconds", "Time spent in each pipeline stage", ("stage",))
+request_seconds = Histogram("ez_request_seconds", "End-to-end time per backend operation", ("operation",))
+requests_total = Counter("ez_requests_total", "Backend operations by outcome", ("operation", "status"))
+llm_tokens_total = Counter("ez_llm_tokens_total", "LLM tokens used", ("kind",))
+cache_hits_total = Counter("ez_cache_hits_total", "Cache hits", ("cache",))
+cache_misses_total = Counter("ez_cache_misses_total", "Cache misses", ("cache",))
+question_retries_total = Counter("ez_question_generation_retries_total", "Extra attempts in generate_logic_questions")
+
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage, recording it on the histogram and current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        record = _current_request.get()
+        if record is not None:
+            record["stages"][stage] = record["stages"].get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def request(operation, **fields):
+    """Group the spans of one backend operation and log them as a JSON line.
+
+    Nested calls join the outer request instead of starting a new one.
+    """
+    if _current_request.get() is not None:
+        yield _current_request.get()
+        return
+
+    record = {
+        "request_id": uuid.uuid4().hex,
+        "operation": operation,
+        "stages": {},
+        "tokens": {"prompt": 0, "completion": 0},
+        **fields
+    }
+    token = _current_request.set(record)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield record
+    except Exception as e:
+        status = "error"
+        record["error"] = str(e)
+        raise
+    finally:
+        _current_request.reset(token)
+        elapsed = time.perf_counter() - start
+        request_seconds.observe(elapsed, operation=operation)
+        requests_total.inc(operation=operation, status=status)
+        record["status"] = status
+        record["duration_s"] = round(elapsed, 6)
+        record["stages"] = {name: round(value, 6) for name, value in record["stages"].items()}
+        logger.info(json.dumps(record, default=str))
+
+
+def traced(operation):
+    """Decorator that runs a backend entry point inside request(operation)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with request(operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_stream(operation):
+    """traced() for generator entry points: one request spans the whole iteration.
+
+    Every step runs in one Context created at the first step, so the request
+    stays current even when the consumer resumes the generator from other
+    threads (e.g. a streaming response in Starlette's threadpool).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            context = contextvars.copy_context()
+
+            def body():
+                with request(operation):
+                    yield from func(*args, **kwargs)
+
+            steps = body()
+            try:
+                while True:
+                    try:
+                        item = context.run(next, steps)
+                    except StopIteration:
+                        return
+                    yield item
+            finally:
+                # Finish the request in its own context if the consumer stops early
+                context.run(steps.close)
+        return wrapper
+    return decorator
+
+
+def current_request():
+    return _current_request.get()
+
+
+def record_tokens(prompt_tokens=0, completion_tokens=0):
+    """Count LLM tokens globally and on the current request"""
+    llm_tokens_total.inc(prompt_tokens, kind="prompt")
+    llm_tokens_total.inc(completion_tokens, kind="completion")
+    record = _current_request.get()
+    if record is not None:
+        record["tokens"]["prompt"] += prompt_tokens
+        record["tokens"]["completion"] += completion_tokens
+
+
+def export_prometheus():
+    """Render every registered metric in Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """Serve /metrics on a background thread; no-op without a port or if running"""
+    global _server
+    port = port or os.getenv("EZ_METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            # http.server is only imported when the exporter is enabled
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = export_prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"📈 Serving Prometheus metrics on :{port}/metrics")
+    return _server
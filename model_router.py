@@ -0,0 +1,117 @@
+"""Per-task Groq model selection from observed latency and error rates.
+
+Modes (EZ_MODEL_ROUTING):
+
+- ``off``: every call uses the first configured model, as before.
+- ``latency``: each call goes to the model with the lowest expected time
+  for its task and input size, i.e. its smoothed latency inflated by its
+  recent error rate (429s and failures mean retries). A model that stops
+  erroring drifts back to its prior over ``recovery_seconds``.
+- ``cascade``: calls start on the fastest model and escalate to the next
+  one only when the output fails validation.
+"""
+import math
+import os
+import threading
+import time
+
+from metrics import Counter
+
+routed_calls_total = Counter("ez_model_routed_calls_total", "LLM calls by routed model", ("task", "model"))
+model_escalations_total = Counter(
+    "ez_model_escalations_total", "Cascade escalations after failed validation", ("task", "from_model", "to_model")
+)
+
+# Fastest first; the cascade escalates along this order
+MODELS = [
+    model.strip()
+    for model in os.getenv("EZ_GROQ_MODELS", "llama-3.1-8b-instant,llama-3.3-70b-versatile").split(",")
+    if model.strip()
+]
+ROUTING_MODE = os.getenv("EZ_MODEL_ROUTING", "off")
+
+# Prompt sizes (characters) are bucketed so long inputs are tracked separately
+_SIZE_BUCKETS = ((2000, "s"), (8000, "m"), (32000, "l"))
+
+
+def size_bucket(input_chars):
+    for limit, name in _SIZE_BUCKETS:
+        if input_chars < limit:
+            return name
+    return "xl"
+
+
+class _Stats:
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.updated_at = time.monotonic()
+
+
+class ModelRouter:
+    def __init__(self, models=None, mode=None, alpha=0.2, recovery_seconds=120.0, prior_seconds=1.0):
+        self.models = list(models or MODELS)
+        self.mode = mode or ROUTING_MODE
+        self.alpha = alpha
+        self.recovery_seconds = recovery_seconds
+        self.prior_seconds = prior_seconds
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _expected_seconds(self, model, task, bucket, now):
+        # Until a model has succeeded, assume later (larger) models are slower
+        prior = self.prior_seconds * 2 ** self.models.index(model)
+        stats = self._stats.get((model, task, bucket))
+        if stats is None:
+            return prior
+        latency = prior if stats.latency is None else stats.latency
+        error_rate = stats.error_rate * math.exp(-(now - stats.updated_at) / self.recovery_seconds)
+        return latency / max(0.05, 1.0 - error_rate)
+
+    def choose(self, task, input_chars=0):
+        """Model for one call of task with a prompt of input_chars characters"""
+        if self.mode != "latency" or len(self.models) == 1:
+            return self.models[0]
+        bucket = size_bucket(input_chars)
+        now = time.monotonic()
+        with self._lock:
+            return min(self.models, key=lambda m: self._expected_seconds(m, task, bucket, now))
+
+    def cascade(self, task, input_chars=0):
+        """Models to try in order for task; just one unless cascading"""
+        return list(self.models) if self.mode == "cascade" else [self.choose(task, input_chars)]
+
+    def escalated(self, task, from_model, to_model):
+        model_escalations_total.inc(task=task, from_model=from_model, to_model=to_model)
+        print(f"⬆️ Escalating {task} from {from_model} to {to_model} after failed validation")
+
+    def observe(self, model, task, input_chars, seconds, ok=True):
+        """Record one call's outcome; failed calls only move the error rate"""
+        key = (model, task, size_bucket(input_chars))
+        with self._lock:
+            stats = self._stats.setdefault(key, _Stats())
+            if ok:
+                stats.latency = seconds if stats.latency is None else (
+                    (1 - self.alpha) * stats.latency + self.alpha * seconds
+                )
+            stats.error_rate = (1 - self.alpha) * stats.error_rate + self.alpha * (0.0 if ok else 1.0)
+            stats.samples += 1
+            stats.updated_at = time.monotonic()
+
+    def report(self):
+        with self._lock:
+            return [
+                {
+                    "model": model,
+                    "task": task,
+                    "size": bucket,
+                    "latency_s": stats.latency,
+                    "error_rate": round(stats.error_rate, 4),
+                    "samples": stats.samples,
+                }
+                for (model, task, bucket), stats in sorted(self._stats.items())
+            ]
+
+
+router = ModelRouter()
@@ -0,0 +1,100 @@
+"""Speculative prefetch of likely follow-up questions.
+
+After each answer a background task predicts a few follow-up questions
+from the conversation and the document summary, then pre-runs retrieval
+(and, in "answer" mode, the full answer) for each at background priority.
+Work stops at the next cancel(), e.g. when the user asks something, and
+never spends more than the token budget, which every new answer renews.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Counter
+
+prefetched_total = Counter("ez_prefetched_total", "Follow-up questions prefetched", ("kind",))
+prefetch_lookups_total = Counter("ez_prefetch_lookups_total", "Questions asked while prefetching was enabled", ("result",))
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+
+class FollowUpPrefetcher:
+    """Per-session prefetcher.
+
+    predict(question, answer) returns follow-up questions,
+    prefetch_retrieval(question) and prefetch_answer(question, cancelled)
+    warm the answer cache, and estimate_tokens(question) sizes an answer
+    call.
+    """
+
+    def __init__(self, predict, prefetch_retrieval, prefetch_answer=None, estimate_tokens=None,
+                 token_budget=6000, predict_tokens=400, max_questions=3):
+        self.predict = predict
+        self.prefetch_retrieval = prefetch_retrieval
+        self.prefetch_answer = prefetch_answer
+        self.estimate_tokens = estimate_tokens or (lambda question: 1500)
+        self.token_budget = token_budget
+        self.tokens_left = token_budget
+        self.predict_tokens = predict_tokens
+        self.max_questions = max_questions
+        self.predictions = []
+        self.hits = 0
+        self.lookups = 0
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._future = None
+
+    def _spend(self, tokens, cancelled):
+        with self._lock:
+            # A cancelled run must not draw on the next turn's budget
+            if cancelled.is_set() or tokens > self.tokens_left:
+                return False
+            self.tokens_left -= tokens
+            return True
+
+    def start(self, question, answer):
+        """Cancel earlier work and prefetch follow-ups to this exchange"""
+        self.cancel()
+        cancelled = self._cancelled = threading.Event()
+        self.predictions = []
+        with self._lock:
+            self.tokens_left = self.token_budget
+        # The caller's context carries the session's usage tags into the worker
+        self._future = _executor.submit(contextvars.copy_context().run, self._run, question, answer, cancelled)
+
+    def cancel(self):
+        # Stages check the flag between calls; an LLM call already in flight
+        # finishes and is shared with an identical foreground call
+        self._cancelled.set()
+
+    def _run(self, question, answer, cancelled):
+        try:
+            if not self._spend(self.predict_tokens, cancelled):
+                return
+            predictions = [q for q in self.predict(question, answer) if q.strip()][:self.max_questions]
+            if cancelled.is_set():
+                return
+            self.predictions = predictions
+            for follow_up in predictions:
+                if cancelled.is_set():
+                    return
+                self.prefetch_retrieval(follow_up)
+                prefetched_total.inc(kind="retrieval")
+            for follow_up in predictions:
+                if self.prefetch_answer is None or cancelled.is_set():
+                    return
+                if not self._spend(self.estimate_tokens(follow_up), cancelled):
+                    print("⏸️ Prefetch token budget used up")
+                    return
+                self.prefetch_answer(follow_up, cancelled)
+                prefetched_total.inc(kind="answer")
+        except Exception as e:
+            print(f"⚠️ Prefetch failed: {e}")
+
+    def record_lookup(self, hit):
+        self.lookups += 1
+        self.hits += int(hit)
+        prefetch_lookups_total.inc(result="hit" if hit else "miss")
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
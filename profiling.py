@@ -0,0 +1,204 @@
+"""Opt-in profiling of backend entry points.
+
+EZ_PROFILE picks the profiler for every profiled call:
+
+- ``off`` (default): nothing is profiled unless a request asks for it.
+- ``sample``: a background thread samples the calling thread's stack every
+  EZ_PROFILE_INTERVAL_MS (default 5) milliseconds. Writes collapsed stacks
+  (``.collapsed``, for flamegraph.pl or speedscope) and the hottest frames.
+- ``cprofile``: deterministic cProfile. Writes ``.prof`` (pstats, snakeviz)
+  and the top functions by cumulative time.
+
+A single request can opt in with ``request_profile(mode)`` or ``bind(mode)``
+(the API's ``?profile=`` parameter, the app's ``?profile=`` URL parameter). Profiles
+go to EZ_PROFILE_DIR (default ``.ez_store/profiles``), keeping the newest
+EZ_PROFILE_KEEP (default 50). Only the calling thread is profiled; work
+handed to other threads (embedding micro-batches, prefetch) is not.
+"""
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+import document_store
+from metrics import Counter, current_request
+
+profiles_written_total = Counter("ez_profiles_written_total", "Profiles written", ("operation", "mode"))
+
+MODES = ("sample", "cprofile")
+PROFILE_DIR = os.getenv("EZ_PROFILE_DIR") or os.path.join(document_store.STORE_DIR, "profiles")
+PROFILE_KEEP = int(os.getenv("EZ_PROFILE_KEEP", "50"))
+INTERVAL_MS = float(os.getenv("EZ_PROFILE_INTERVAL_MS", "5"))
+
+_requested = contextvars.ContextVar("ez_profile_requested", default=None)
+# Set while a profiled call runs so nested entry points join the outer profile
+_active = contextvars.ContextVar("ez_profile_active", default=False)
+
+
+def _mode():
+    mode = _requested.get() or os.getenv("EZ_PROFILE", "off")
+    return mode if mode in MODES else None
+
+
+def _valid(mode):
+    # An unknown mode (a typo in ?profile=) must not switch off EZ_PROFILE
+    return mode if mode in MODES else None
+
+
+def bind(mode):
+    """Profile mode for the rest of the current context (e.g. one Streamlit run); None or unknown defers to EZ_PROFILE"""
+    _requested.set(_valid(mode))
+
+
+@contextmanager
+def request_profile(mode="sample"):
+    """Profile the entry points called inside the block, whatever EZ_PROFILE says; unknown modes defer to it"""
+    token = _requested.set(_valid(mode))
+    try:
+        yield
+    finally:
+        _requested.reset(token)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Counts the stacks of one thread at a fixed interval"""
+
+    def __init__(self, thread_id=None, interval_ms=INTERVAL_MS):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval_ms / 1000
+        self.stacks = _Tally()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Brendan Gregg's folded format: one "frame;frame;frame count" line per stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit=30):
+        total = sum(self.stacks.values()) or 1
+        own = _Tally()
+        for stack, count in self.stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        lines = [f"{total} samples every {self.interval * 1000:g} ms", "", "self%   samples  frame"]
+        lines += [f"{count / total:6.1%}  {count:7d}  {frame}" for frame, count in own.most_common(limit)]
+        return "\n".join(lines) + "\n"
+
+
+def _write(stem, files):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    for extension, data in files.items():
+        path = os.path.join(PROFILE_DIR, f"{stem}.{extension}")
+        with open(path, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+    _rotate()
+    return os.path.join(PROFILE_DIR, stem)
+
+
+def _rotate():
+    """Delete the oldest profiles beyond PROFILE_KEEP (files sharing a stem count once)"""
+    names = os.listdir(PROFILE_DIR)
+    newest = {}
+    for name in names:
+        stem = name.split(".", 1)[0]
+        try:
+            newest[stem] = max(newest.get(stem, 0), os.path.getmtime(os.path.join(PROFILE_DIR, name)))
+        except FileNotFoundError:
+            # Rotated away by another worker
+            continue
+    expired = set(sorted(newest, key=newest.get, reverse=True)[PROFILE_KEEP:])
+    for name in names:
+        if name.split(".", 1)[0] in expired:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def _save_cprofile(profile, stem):
+    import io
+    import marshal
+    import pstats
+
+    profile.create_stats()
+    # Serialized first: pstats.Stats takes over (and empties) the profile's stats
+    dump = marshal.dumps(profile.stats)
+    report = io.StringIO()
+    pstats.Stats(profile, stream=report).sort_stats("cumulative").print_stats(40)
+    return _write(stem, {"prof": dump, "txt": report.getvalue()})
+
+
+def profiled(operation):
+    """Decorator profiling a backend entry point when EZ_PROFILE or the request asks"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            mode = _mode()
+            if mode is None or _active.get():
+                return func(*args, **kwargs)
+
+            record = current_request()
+            request_id = record["request_id"][:12] if record is not None else f"{os.getpid()}"
+            # The suffix keeps profiles of one operation in the same second (and request) apart
+            stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{operation}-{request_id}-{uuid.uuid4().hex[:8]}"
+            if mode == "cprofile":
+                import cProfile
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError as e:
+                    # Python 3.12+ allows one cProfile at a time per process
+                    print(f"⚠️ Not profiling {operation}: {e}")
+                    return func(*args, **kwargs)
+            else:
+                profiler = StackSampler()
+                profiler.start()
+            token = _active.set(True)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _active.reset(token)
+                if mode == "cprofile":
+                    profiler.disable()
+                else:
+                    profiler.stop()
+                try:
+                    if mode == "cprofile":
+                        path = _save_cprofile(profiler, stem)
+                    else:
+                        path = _write(stem, {"collapsed": profiler.collapsed(), "txt": profiler.summary()})
+                    profiles_written_total.inc(operation=operation, mode=mode)
+                    if record is not None:
+                        record["profile"] = path
+                    print(f"🔬 Profile written to {path}.*")
+                except OSError as e:
+                    print(f"⚠️ Could not write profile: {e}")
+        return wrapper
+    return decorator
@@ -60,4 +60,33 @@ Question: {question}
 User's Answer: {response}
 
 Evaluate the correctness of the user's answer, then briefly explain why it is right or wrong.
-"""
\ No newline at end of file
+"""
+CONVERSATION_SUMMARY_PROMPT = """
+You are maintaining a running summary of a conversation about a document.
+
+Current summary:
+{summary}
+
+New exchanges to fold in:
+{exchanges}
+
+Write an updated summary in 100 words or fewer that keeps the facts, names and conclusions needed to answer follow-up questions.
+"""
+MULTI_QUERY_PROMPT = """
+Rewrite the question below in {count} different ways that a research paper might phrase the relevant passage.
+Use the paper's likely terminology. Return one rewrite per line with no numbering or extra text.
+
+Question: {question}
+"""
+FOLLOWUP_PROMPT = """
+A user is reading a research document and asking questions about it.
+
+Document summary:
+{summary}
+
+Last question: {question}
+Answer given: {answer}
+
+Predict the {count} follow-up questions the user is most likely to ask next about the document.
+Return one question per line with no numbering or extra text.
+"""
@@ -0,0 +1,259 @@
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import Counter, Gauge
+
+# Lower numbers are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_CHALLENGE = 1
+PRIORITY_SUMMARY = 5
+PRIORITY_BACKGROUND = 9
+
+rate_limited_total = Counter("ez_llm_rate_limited_total", "LLM calls rejected with 429")
+llm_retries_total = Counter("ez_llm_retries_total", "LLM calls retried after backoff", ("reason",))
+concurrency_limit_gauge = Gauge("ez_llm_concurrency_limit", "Current adaptive LLM concurrency limit")
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an LLM call is still rate limited after all retries"""
+
+
+def parse_duration(value):
+    """Parse Groq reset headers like '2m59.56s', '7.66s' or '120ms' into seconds"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    matches = _DURATION_RE.findall(str(value))
+    if not matches:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in matches)
+
+
+def _status_code(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_rate_limit_error(error):
+    """HTTP 429 or the client's RateLimitError; the message is only consulted when neither is known"""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429
+    if type(error).__name__ == "RateLimitError":
+        return True
+    return "rate limit" in str(error).lower()
+
+
+def is_transient_error(error):
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    name = type(error).__name__.lower()
+    return "timeout" in name or "connection" in name
+
+
+class TokenBucket:
+    """Token bucket that can be re-synchronized from server-reported limits"""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount):
+        """Seconds until amount tokens are available (0 if they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def sync(self, limit=None, remaining=None, reset_seconds=None):
+        """Adopt the limit/remaining values reported by the API"""
+        self._refill()
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if reset_seconds and self.capacity > remaining:
+                # Remaining budget refills to capacity by the reset time
+                self.refill_per_second = max(self.refill_per_second, (self.capacity - remaining) / reset_seconds)
+
+
+class AdaptiveRateLimiter:
+    """Shared limiter for all Groq calls in the process.
+
+    Combines request and token buckets synced from rate-limit headers, an
+    AIMD concurrency limit (additive increase on success, halving on 429)
+    and a priority queue so interactive calls go ahead of background work.
+    With enabled False calls are not paced or queued, only retried.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=6000,
+                 initial_concurrency=4, max_concurrency=16, max_retries=4,
+                 base_backoff=0.5, max_backoff=30.0, enabled=True):
+        self.enabled = enabled
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.concurrency_limit = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        concurrency_limit_gauge.set(self.concurrency_limit)
+
+    def _wait_time(self, estimated_tokens):
+        return max(
+            self.blocked_until - time.monotonic(),
+            self.request_bucket.wait_time(1),
+            self.token_bucket.wait_time(estimated_tokens)
+        )
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE, estimated_tokens=500):
+        """Wait for this call's turn, then hold one concurrency slot"""
+        if not self.enabled:
+            yield
+            return
+        entry = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            while True:
+                if self._waiters[0] == entry and self.in_flight < int(self.concurrency_limit):
+                    wait = self._wait_time(estimated_tokens)
+                    if wait <= 0:
+                        break
+                    self._condition.wait(timeout=wait)
+                else:
+                    self._condition.wait(timeout=1.0)
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(estimated_tokens)
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            # Additive increase: about +1 slot per window of successful calls
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            concurrency_limit_gauge.set(self.concurrency_limit)
+            self._condition.notify_all()
+
+    def on_rate_limited(self, retry_after=None):
+        rate_limited_total.inc()
+        with self._condition:
+            # Multiplicative decrease
+            self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+            concurrency_limit_gauge.set(self.concurrency_limit)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def update_from_headers(self, headers):
+        """Sync buckets from Groq x-ratelimit-* response headers"""
+        def number(name):
+            try:
+                return float(headers[name])
+            except (KeyError, TypeError, ValueError):
+                return None
+
+        with self._condition:
+            # Groq reports requests per day and tokens per minute. The request
+            # limit only raises the burst allowance; the pace stays at the
+            # configured rate unless the remaining budget refills faster
+            self.request_bucket.sync(
+                limit=number("x-ratelimit-limit-requests"),
+                remaining=number("x-ratelimit-remaining-requests"),
+                reset_seconds=parse_duration(headers.get("x-ratelimit-reset-requests"))
+            )
+            self.token_bucket.sync(
+                limit=number("x-ratelimit-limit-tokens"),
+                remaining=number("x-ratelimit-remaining-tokens"),
+                reset_seconds=parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            )
+            self._condition.notify_all()
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than retry-after"""
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    def call(self, fn, priority=PRIORITY_INTERACTIVE, estimated_tokens=500):
+        """Run fn under the limiter, retrying 429s and transient errors with backoff"""
+        for attempt in range(self.max_retries + 1):
+            with self.slot(priority, estimated_tokens):
+                try:
+                    result = fn()
+                except Exception as e:
+                    error = e
+                else:
+                    self.on_success()
+                    return result
+
+            if is_rate_limit_error(error):
+                retry_after = _retry_after(error)
+                self.on_rate_limited(retry_after)
+                reason = "rate_limited"
+            elif is_transient_error(error):
+                retry_after = None
+                reason = "transient"
+            else:
+                raise error
+
+            if attempt == self.max_retries:
+                if reason == "rate_limited":
+                    raise RateLimitExceeded(str(error)) from error
+                raise error
+            llm_retries_total.inc(reason=reason)
+            delay = self.backoff(attempt, retry_after)
+            print(f"⏳ LLM call {reason}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return parse_duration(headers.get("retry-after"))
+
+
+# Defaults match Groq's free tier; raise them for paid plans. EZ_RATE_LIMIT=off
+# stops pacing (e.g. against a local stub); 429s are still retried
+ENABLED = os.getenv("EZ_RATE_LIMIT", "on") != "off"
+
+limiter = AdaptiveRateLimiter(
+    enabled=ENABLED,
+    requests_per_minute=float(os.getenv("EZ_GROQ_RPM", "30")),
+    tokens_per_minute=float(os.getenv("EZ_GROQ_TPM", "6000")),
+    initial_concurrency=int(os.getenv("EZ_LLM_CONCURRENCY", "4")),
+    max_concurrency=int(os.getenv("EZ_LLM_MAX_CONCURRENCY", "16"))
+)
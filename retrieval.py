@@ -0,0 +1,106 @@
+"""Multi-query retrieval with one batched embedding and one batched FAISS search.
+
+A question is expanded into a few reformulations (local rewrite rules,
+optionally plus LLM paraphrases). All of them are embedded in a single
+embed_documents call, searched with a single index.search over the query
+matrix, and the ranked lists are fused with reciprocal rank fusion.
+"""
+import re
+
+RRF_K = 60
+MAX_QUERIES = 5
+
+_QUESTION_WORDS = re.compile(
+    r"^\s*(?:what|which|who|whom|whose|when|where|why|how(?:\s+(?:many|much|does|do|did|is|are|was|were))?|"
+    r"is|are|was|were|does|do|did|can|could|should|would|will|explain|describe|tell me about)\b\s*",
+    re.IGNORECASE
+)
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "was", "were", "be", "been",
+    "this", "that", "these", "those", "it", "its", "by", "with", "as", "at", "from", "paper", "authors",
+    "author", "they", "their", "used", "use", "using", "does", "do", "did", "what", "which", "how", "why",
+}
+
+# Everyday wording mapped to the vocabulary papers tend to use
+SYNONYMS = {
+    "dataset": "data set corpus benchmark",
+    "data": "dataset corpus samples",
+    "method": "approach technique model",
+    "approach": "method technique",
+    "result": "findings performance evaluation",
+    "results": "findings performance evaluation",
+    "improve": "outperform gain increase",
+    "improves": "outperforms gains increases",
+    "problem": "task challenge limitation",
+    "limitation": "weakness drawback future work",
+    "limitations": "weaknesses drawbacks future work",
+    "accuracy": "performance score metric",
+    "metric": "evaluation measure score",
+    "metrics": "evaluation measures scores",
+    "goal": "objective aim contribution",
+    "contribution": "propose introduce novel",
+    "train": "training optimization learning",
+    "trained": "training optimization learning",
+    "compare": "baseline comparison versus",
+    "conclusion": "conclude summary findings",
+}
+
+
+def expand_query(query, max_queries=MAX_QUERIES):
+    """Cheap local reformulations of a question, the original first"""
+    queries = [query.strip()]
+    statement = _QUESTION_WORDS.sub("", query.strip()).rstrip("?. ").strip()
+    if statement:
+        queries.append(statement)
+
+    words = re.findall(r"\w+", query.lower())
+    keywords = [word for word in words if word not in _STOPWORDS]
+    if keywords:
+        queries.append(" ".join(keywords))
+        expanded = [SYNONYMS[word] for word in keywords if word in SYNONYMS]
+        if expanded:
+            queries.append(" ".join(keywords + expanded))
+
+    unique = []
+    for candidate in queries:
+        if candidate and candidate.lower() not in {q.lower() for q in unique}:
+            unique.append(candidate)
+    return unique[:max_queries]
+
+
+def _embedding_model(vector_store):
+    return getattr(vector_store, "embeddings", None) or vector_store.embedding_function
+
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K):
+    """Fuse ranked id lists; returns ids ordered by summed 1 / (k + rank)"""
+    scores = {}
+    for ranking in ranked_lists:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True), scores
+
+
+def multi_query_search(vector_store, queries, k=5, fetch_k=None):
+    """Return the top-k Documents for several queries with one embed and one search call"""
+    import numpy as np
+
+    index = vector_store.index
+    if not queries or index.ntotal == 0:
+        return []
+    fetch_k = fetch_k or k * 2
+    vectors = np.asarray(_embedding_model(vector_store).embed_documents(list(queries)), dtype="float32")
+    if getattr(vector_store, "_normalize_L2", False):
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    _, rows = index.search(vectors, min(fetch_k, index.ntotal))
+    ranked_lists = [[int(row) for row in query_rows if row != -1] for query_rows in rows]
+    fused, _ = reciprocal_rank_fusion(ranked_lists)
+
+    docs = []
+    for row in fused[:k]:
+        doc = vector_store.docstore.search(vector_store.index_to_docstore_id[row])
+        # Docstores return a "not found" string for unknown ids
+        if not isinstance(doc, str):
+            docs.append(doc)
+    return docs
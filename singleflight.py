@@ -0,0 +1,76 @@
+import hashlib
+import threading
+
+from metrics import Counter
+
+upstream_calls_total = Counter("ez_llm_upstream_calls_total", "LLM calls actually sent upstream")
+coalesced_calls_total = Counter("ez_llm_coalesced_calls_total", "LLM calls served by an identical in-flight call")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one execution among concurrent callers with the same key.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait and receive the same result (or exception). Nothing is
+    cached once the call completes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            coalesced_calls_total.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        upstream_calls_total.inc()
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def llm_call_key(llm, rendered_prompt, priority=None):
+    """Key identifying an LLM call by model, temperature, exact prompt and priority.
+
+    Only calls of one priority share a flight, so an interactive call never
+    waits behind an identical background call (e.g. a prefetched answer)
+    still queued in the rate limiter.
+    """
+    model = getattr(llm, "model_name", None) or type(llm).__name__
+    temperature = getattr(llm, "temperature", None)
+    digest = hashlib.sha256(rendered_prompt.encode("utf-8")).hexdigest()
+    return (model, temperature, digest, priority)
+
+
+llm_flights = SingleFlight()
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return TestClient(api.app)
+
+
+def test_binary_text_upload_is_rejected(client):
+    response = client.post("/documents", content=b"\xff\xfe\x00binary", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 400
+
+
+def test_unsupported_content_type_is_rejected(client):
+    response = client.post("/documents", content=b"GIF89a", headers={"Content-Type": "image/gif"})
+    assert response.status_code == 400
+
+
+def test_unreadable_pdf_is_rejected(client):
+    pytest.importorskip("fitz")
+    response = client.post("/documents", content=b"not a pdf", headers={"Content-Type": "application/pdf"})
+    assert response.status_code == 400
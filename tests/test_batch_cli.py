@@ -0,0 +1,27 @@
+import sys
+import types
+
+import batch_cli
+
+
+def test_process_document_outside_the_pool(tmp_path, monkeypatch):
+    # No worker initializer ran, so the LLM semaphore is the default
+    document = tmp_path / "paper.txt"
+    document.write_text("A short paper about attention.", encoding="utf-8")
+
+    saved = {}
+    store = types.SimpleNamespace(
+        has_document=lambda doc_hash: False,
+        save_document=lambda doc_hash, text, page_starts: saved.setdefault("document", text),
+        has_index=lambda doc_hash: True,
+        load_summary=lambda doc_hash: None,
+        save_summary=lambda doc_hash, summary: saved.setdefault("summary", summary),
+    )
+    backend = types.SimpleNamespace(summarize_document=lambda text: "A summary.")
+    monkeypatch.setitem(sys.modules, "document_store", store)
+    monkeypatch.setitem(sys.modules, "backend", backend)
+
+    result = batch_cli.process_document(str(document))
+
+    assert result["status"] == "ok", result
+    assert saved == {"document": "A short paper about attention.", "summary": "A summary."}
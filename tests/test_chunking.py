@@ -0,0 +1,37 @@
+from chunking import split_structured
+
+INTRO = "1 Introduction\n" + "We study how model size affects accuracy on reading comprehension. " * 4
+TABLE = "\n".join([
+    "4 Results",
+    "Table 1 compares the three models.",
+    "Model", "Params", "Acc",
+    "BERT", "110", "84.2",
+    "RoBERTa", "125", "86.1",
+    "GPT", "117", "82.0",
+])
+OUTRO = "Larger pretraining corpora help more than extra parameters. " * 4 + "\n\n5 Conclusion\n" + "Data matters. " * 10
+
+
+def test_table_cells_stay_in_their_section():
+    text = "\n\n".join([INTRO, TABLE, OUTRO])
+    chunks = split_structured(text)
+    chunked = "".join(text[start:end] for start, end, _, _ in chunks)
+    for cell in ("Model", "BERT", "110", "84.2", "RoBERTa", "125", "86.1", "GPT", "117", "82.0"):
+        assert f"\n{cell}\n" in f"\n{chunked}\n"
+    sections = {section for _, _, section, _ in chunks}
+    assert "Model" not in sections
+    table_chunks = [text[start:end] for start, end, section, _ in chunks if section == "4 Results"]
+    assert any("BERT\n110\n84.2\nRoBERTa" in chunk for chunk in table_chunks)
+
+
+def test_page_numbers_at_page_edges_are_dropped():
+    topics = ["datasets", "training", "ablations", "errors"]
+    pages = [f"Running title of the paper\nThis page covers {topic}. " + f"More about {topic}. " * 20 + f"\n{n}\n"
+             for n, topic in enumerate(topics, 1)]
+    text = "".join(pages)
+    page_starts = [sum(len(p) for p in pages[:n]) for n in range(len(pages))]
+    chunks = split_structured(text, page_starts)
+    chunked = [text[start:end] for start, end, _, _ in chunks]
+    assert not any(chunk.strip().isdigit() for chunk in chunked)
+    assert not any("Running title" in chunk for chunk in chunked)
+    assert all(f"This page covers {topic}" in "".join(chunked) for topic in topics)
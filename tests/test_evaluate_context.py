@@ -0,0 +1,34 @@
+import pytest
+
+import backend
+import usage
+
+TOPICS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+DOCUMENT = "\n\n".join(f"This paragraph discusses {topic} at length. " * 15 for topic in TOPICS)
+
+
+@pytest.fixture
+def sent_context(monkeypatch):
+    sent = []
+    monkeypatch.setattr(backend, "get_groq_llm", lambda task, input_chars: None)
+    monkeypatch.setattr(backend, "make_chain", lambda llm, template: None)
+    monkeypatch.setattr(backend, "run_chain", lambda chain, priority, task, context, **inputs: sent.append(context))
+    monkeypatch.delenv("EZ_EVALUATE_CONTEXT_CHARS", raising=False)
+    return sent
+
+
+def test_whole_document_on_an_ok_budget(sent_context):
+    backend.evaluate_user_response(DOCUMENT, "What about delta?", "It is covered.")
+    assert sent_context == [DOCUMENT]
+
+
+def test_focused_when_configured(sent_context, monkeypatch):
+    monkeypatch.setenv("EZ_EVALUATE_CONTEXT_CHARS", "2000")
+    backend.evaluate_user_response(DOCUMENT, "What about delta?", "It is covered.")
+    assert len(sent_context[0]) <= 2000 and "delta" in sent_context[0]
+
+
+def test_focused_on_a_low_budget(sent_context, monkeypatch):
+    monkeypatch.setattr(usage.ledger, "level", lambda *args: "low")
+    backend.evaluate_user_response(DOCUMENT, "What about delta?", "It is covered.")
+    assert len(sent_context[0]) <= 1500 and "delta" in sent_context[0]
@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+import batch_cli
+from index_registry import document_hash
+from utils import extract_uploaded_file
+
+
+class Upload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile"""
+
+    def __init__(self, data, type):
+        super().__init__(data)
+        self.type = type
+
+
+def test_app_and_batch_cli_hash_pdfs_identically(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    pdf = fitz.open()
+    for text in ("First page of the paper.", "Second page, with results."):
+        pdf.new_page().insert_text((72, 72), text)
+    path = tmp_path / "paper.pdf"
+    pdf.save(str(path))
+
+    app_text, app_pages = extract_uploaded_file(Upload(path.read_bytes(), "application/pdf"))
+    cli_text, cli_pages = batch_cli.read_document(str(path))
+
+    assert document_hash(app_text) == document_hash(cli_text)
+    assert app_pages == cli_pages
+
+
+def test_app_and_batch_cli_hash_text_identically(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Line one.\nLine two.\n", encoding="utf-8")
+
+    app_text, app_pages = extract_uploaded_file(Upload(path.read_bytes(), "text/plain"))
+    cli_text, cli_pages = batch_cli.read_document(str(path))
+
+    assert document_hash(app_text) == document_hash(cli_text)
+    assert app_pages is cli_pages is None
+
+
+def test_unsupported_upload_is_rejected():
+    with pytest.raises(ValueError):
+        extract_uploaded_file(Upload(b"", "image/png"))
@@ -0,0 +1,53 @@
+import pickle
+from array import array
+
+from grounding import MAX_SPANS_PER_QUOTE, QuoteIndex
+
+TEXT = ("The Transformer relies entirely on attention. " * 3
+        + "Recurrent layers are\nreplaced by  self-attention, which connects all positions. "
+        + "Results improve on both translation tasks. ")
+
+
+def test_locates_quotes_despite_case_whitespace_and_punctuation():
+    index = QuoteIndex(TEXT)
+    (span,) = index.locate("recurrent layers are replaced by self attention")
+    assert TEXT[span[0]:span[1]] == "Recurrent layers are\nreplaced by  self-attention"
+    assert all(isinstance(offset, int) for offset in span)
+
+
+def test_short_fragments_and_unknown_words_are_not_grounded():
+    index = QuoteIndex(TEXT)
+    assert index.locate("attention") == []
+    assert index.locate("relies entirely on gravity") == []
+
+
+def test_frequent_phrases_are_capped():
+    index = QuoteIndex("the model is good. " * 50)
+    assert len(index.locate("the model is good")) == MAX_SPANS_PER_QUOTE
+
+
+def test_postings_are_flat_arrays():
+    index = QuoteIndex(TEXT * 100)
+    tokens = len(index.token_ids)
+    # Token ids, offsets and postings; the vocabulary does not grow with repetition
+    assert index.memory_bytes() < 32 * tokens + 10_000
+    assert len(index.ngram_positions) == tokens - index.ngram_size + 1
+
+
+def test_indexes_pickled_with_dict_postings_still_load():
+    current = QuoteIndex(TEXT)
+    words = {token_id: word for word, token_id in current.vocabulary.items()}
+    legacy = {
+        "text_length": current.text_length,
+        "ngram_size": 3,
+        "page_starts": [0],
+        "tokens": [words[token_id] for token_id in current.token_ids],
+        "token_starts": array("l", current.token_starts),
+        "token_ends": array("l", current.token_ends),
+        "postings": {},
+    }
+    restored = QuoteIndex.__new__(QuoteIndex)
+    restored.__setstate__(legacy)
+    quote = "connects all positions"
+    assert restored.locate(quote) == current.locate(quote)
+    assert pickle.loads(pickle.dumps(current)).locate(quote) == current.locate(quote)
@@ -0,0 +1,19 @@
+import threading
+
+from prefetch import FollowUpPrefetcher
+
+
+def test_every_answer_renews_the_token_budget():
+    spent = threading.Event()
+    prefetcher = FollowUpPrefetcher(
+        predict=lambda question, answer: ["Why?"],
+        prefetch_retrieval=lambda question: spent.set(),
+        token_budget=1000,
+        predict_tokens=600,
+    )
+    for turn in range(3):
+        spent.clear()
+        prefetcher.start(f"Question {turn}", "Answer")
+        prefetcher._future.result()
+        assert spent.is_set(), f"turn {turn} was not prefetched"
+        assert prefetcher.tokens_left == 400
@@ -0,0 +1,36 @@
+import contextvars
+import os
+
+import profiling
+
+
+def test_unknown_request_mode_defers_to_env(monkeypatch):
+    monkeypatch.setenv("EZ_PROFILE", "cprofile")
+    with profiling.request_profile("flamegraph"):
+        assert profiling._mode() == "cprofile"
+    with profiling.request_profile("sample"):
+        assert profiling._mode() == "sample"
+
+
+def test_bind_ignores_unknown_modes(monkeypatch):
+    monkeypatch.setenv("EZ_PROFILE", "sample")
+
+    def run():
+        profiling.bind("yes")
+        return profiling._mode()
+
+    assert contextvars.copy_context().run(run) == "sample"
+
+
+def test_profiles_in_the_same_second_do_not_overwrite(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("EZ_PROFILE", "sample")
+
+    @profiling.profiled("work")
+    def work():
+        return sum(range(1000))
+
+    for _ in range(3):
+        work()
+    stems = {name.split(".", 1)[0] for name in os.listdir(tmp_path)}
+    assert len(stems) == 3
@@ -0,0 +1,50 @@
+import json
+
+import backend
+from model_router import ModelRouter
+
+QUESTION = {"question": "Q?", "options": ["A) a", "B) b", "C) c", "D) d"], "answer": "b", "explanation": "..."}
+
+
+def test_only_failed_validation_escalates(monkeypatch):
+    router = ModelRouter(models=["small", "large"], mode="cascade")
+    escalations = []
+    monkeypatch.setattr(router, "escalated", lambda task, from_model, to_model: escalations.append((from_model, to_model)))
+    monkeypatch.setattr(backend, "router", router)
+    monkeypatch.setattr(backend, "get_groq_llm", lambda model, temperature, task: model)
+    monkeypatch.setattr(backend, "make_chain", lambda llm, template: llm)
+
+    used = []
+    responses = iter([RuntimeError("connection reset"), "no questions here", json.dumps([QUESTION, QUESTION])])
+
+    def run_chain(model, priority, task, **inputs):
+        used.append(model)
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(backend, "run_chain", run_chain)
+
+    questions = backend.generate_logic_questions("Some document text. " * 20)
+
+    assert len(questions) == 2 and questions[0]["answer"] == "B"
+    # The error retried the cheap model; only the unparseable output moved on
+    assert used == ["small", "small", "large"]
+    assert escalations == [("small", "large")]
+
+
+def test_models_are_chosen_by_rendered_prompt_size(monkeypatch):
+    # run_chain records latency under the rendered prompt's size bucket; choosing by the same size finds it
+    sizes = []
+    router = ModelRouter(models=["small"], mode="cascade")
+    monkeypatch.setattr(router, "cascade", lambda task, input_chars: sizes.append(input_chars) or ["small"])
+    monkeypatch.setattr(backend, "router", router)
+    monkeypatch.setattr(backend, "get_groq_llm", lambda model, temperature, task: model)
+    monkeypatch.setattr(backend, "make_chain", lambda llm, template: llm)
+    monkeypatch.setattr(backend, "run_chain", lambda chain, priority, task, **inputs: json.dumps([QUESTION] * 2))
+
+    content = "Some document text. " * 20
+    backend.generate_logic_questions(content)
+
+    assert sizes == [len(backend.LOGIC_QUESTION_GEN_PROMPT.format(context=content))]
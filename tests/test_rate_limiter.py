@@ -0,0 +1,55 @@
+import time
+
+import groq_llm
+import rate_limiter as limiter_module
+from rate_limiter import AdaptiveRateLimiter, is_rate_limit_error
+
+
+class APIError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def test_status_code_decides():
+    assert is_rate_limit_error(APIError("Too many requests", status_code=429))
+    # A 429 in the text of another error (token counts, request ids, page numbers) is not a rate limit
+    assert not is_rate_limit_error(APIError("prompt has 4290 tokens; see section 429", status_code=400))
+
+
+def test_exception_type_and_phrase_fallback():
+    assert is_rate_limit_error(RateLimitError("slow down"))
+    assert is_rate_limit_error(RuntimeError("Rate limit reached for model"))
+    assert not is_rate_limit_error(ValueError("could not parse answer 429"))
+
+
+def test_request_limit_header_raises_the_cap():
+    limiter = AdaptiveRateLimiter(requests_per_minute=30)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "14400",
+        "x-ratelimit-remaining-requests": "14000",
+        "x-ratelimit-reset-requests": "6s",
+    })
+    assert limiter.request_bucket.capacity == 14400
+    assert limiter.request_bucket.refill_per_second > 60
+
+
+def test_disabled_limiter_does_not_pace():
+    limiter = AdaptiveRateLimiter(requests_per_minute=1, tokens_per_minute=100, enabled=False)
+    start = time.monotonic()
+    for _ in range(20):
+        limiter.call(lambda: None, estimated_tokens=1900)
+    assert time.monotonic() - start < 0.5
+
+
+def test_fake_llm_factories_skip_the_limiter():
+    previous = groq_llm.set_llm_factory(lambda model, temperature: None)
+    try:
+        assert not limiter_module.limiter.enabled
+    finally:
+        groq_llm.set_llm_factory(previous)
+    assert limiter_module.limiter.enabled == limiter_module.ENABLED
@@ -0,0 +1,43 @@
+import threading
+
+import backend
+from rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+
+class Prompt:
+    def format(self, question, tier):
+        # The tier is only for the fake; both calls render the same prompt
+        return question
+
+
+class BlockingChain:
+    """Background calls block until released; interactive ones return at once"""
+
+    def __init__(self):
+        self.prompt = Prompt()
+        self.llm = type("LLM", (), {"model_name": "stub-model", "temperature": 0.0})()
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def run(self, question, tier):
+        if tier == PRIORITY_BACKGROUND:
+            self.started.set()
+            self.release.wait(5)
+        return f"answer ({tier})"
+
+
+def test_interactive_call_does_not_join_a_background_flight():
+    chain = BlockingChain()
+    background = threading.Thread(
+        target=backend.run_chain, args=(chain, PRIORITY_BACKGROUND),
+        kwargs={"question": "Why?", "tier": PRIORITY_BACKGROUND}
+    )
+    background.start()
+    try:
+        assert chain.started.wait(5)
+        # Same prompt; it must be served on its own instead of waiting for the prefetch
+        answer = backend.run_chain(chain, PRIORITY_INTERACTIVE, question="Why?", tier=PRIORITY_INTERACTIVE)
+        assert answer == f"answer ({PRIORITY_INTERACTIVE})"
+    finally:
+        chain.release.set()
+        background.join()
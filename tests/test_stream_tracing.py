@@ -0,0 +1,95 @@
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import backend
+import groq_llm
+import usage
+from metrics import logger
+
+
+class Doc:
+    def __init__(self, text):
+        self.page_content = text
+        self.metadata = {}
+
+
+class Retriever:
+    def get_relevant_documents(self, query):
+        time.sleep(0.01)
+        return [Doc("The experiments use the CIFAR-10 dataset.")]
+
+
+class VectorStore:
+    def as_retriever(self, search_kwargs=None):
+        return Retriever()
+
+
+class StreamingLLM:
+    model_name = "stub-model"
+
+    def stream(self, prompt):
+        for piece in ["ANSWER: CIFAR-10.\n", "SUPPORTING_QUOTES:\n", '"The experiments use the CIFAR-10 dataset."']:
+            time.sleep(0.02)
+            yield piece
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(json.loads(record.getMessage()))
+
+
+@pytest.fixture
+def request_log(monkeypatch, tmp_path):
+    monkeypatch.setattr(usage.ledger, "directory", str(tmp_path))
+    previous = groq_llm.set_llm_factory(lambda model, temperature: StreamingLLM())
+    handler = Capture()
+    logger.addHandler(handler)
+    yield handler.records
+    logger.removeHandler(handler)
+    groq_llm.set_llm_factory(previous)
+
+
+def _ask_stream_records(records):
+    return [r for r in records if r["operation"] == "ask_stream"]
+
+
+def test_stream_request_spans_the_whole_iteration(request_log):
+    events = list(backend.stream_answer_with_highlighting(VectorStore(), "Which dataset is used?"))
+
+    assert events[-1][0] == "result"
+    assert events[-1][1]["answer"] == "CIFAR-10."
+    (record,) = _ask_stream_records(request_log)
+    assert record["status"] == "ok"
+    assert record["duration_s"] >= 0.06
+    assert {"retrieve", "prompt", "llm", "highlight"} <= set(record["stages"])
+    assert record["stages"]["llm"] >= 0.06
+    # Streamed usage is estimated and attached to the request
+    assert record["tokens"]["prompt"] > 0 and record["tokens"]["completion"] > 0
+
+
+def test_stream_resumed_from_other_threads_keeps_its_request(request_log):
+    stream = backend.stream_answer_with_highlighting(VectorStore(), "Which dataset is used?")
+    events = []
+
+    # Like Starlette, pull every event from a fresh thread
+    while True:
+        box = []
+        worker = threading.Thread(target=lambda: box.append(next(stream, None)))
+        worker.start()
+        worker.join()
+        if box[0] is None:
+            break
+        events.append(box[0])
+
+    assert events[-1][0] == "result"
+    (record,) = _ask_stream_records(request_log)
+    assert record["status"] == "ok"
+    assert record["stages"]["llm"] >= 0.06
@@ -0,0 +1,34 @@
+import pytest
+
+import backend
+import document_store
+import usage
+
+DOCUMENT = "Opening sentence of the paper. " * 300
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    stored = {}
+    sent = []
+    monkeypatch.setattr(document_store, "load_summary", stored.get)
+    monkeypatch.setattr(document_store, "save_summary", stored.__setitem__)
+    monkeypatch.setattr(backend, "get_groq_llm", lambda task, input_chars: None)
+    monkeypatch.setattr(backend, "make_chain", lambda llm, template: None)
+    monkeypatch.setattr(backend, "run_chain",
+                        lambda chain, priority, task, content: sent.append(content) or f"summary of {len(content)}")
+    return stored, sent
+
+
+def test_low_budget_summary_is_not_stored(summaries, monkeypatch):
+    stored, sent = summaries
+    monkeypatch.setattr(usage.ledger, "level", lambda *args: "low")
+    assert backend.get_document_summary(DOCUMENT, "doc") == "summary of 2000"
+    assert stored == {}
+
+    # Once the budget recovers the full summary is made and kept
+    monkeypatch.setattr(usage.ledger, "level", lambda *args: "ok")
+    assert backend.get_document_summary(DOCUMENT, "doc") == "summary of 5000"
+    assert stored == {"doc": "summary of 5000"}
+    assert backend.get_document_summary(DOCUMENT, "doc") == "summary of 5000"
+    assert len(sent) == 2
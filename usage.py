@@ -0,0 +1,245 @@
+"""Token and cost accounting per feature, document and session, with budgets.
+
+Every LLM call's prompt and completion tokens go into an in-memory ledger
+keyed by feature (the backend task), document hash, session and model.
+A background thread appends the deltas to a daily JSONL file under the
+store root, so usage survives restarts and can be totalled across workers.
+
+Budgets are tokens per UTC day, 0 disables them:
+
+- ``EZ_TOKEN_BUDGET_DOCUMENT``: all sessions working on one document
+- ``EZ_TOKEN_BUDGET_SESSION``: one session across its documents
+
+Below ``EZ_TOKEN_BUDGET_LOW_FRACTION`` (default 0.2) of a budget the level
+is "low" and callers shrink their context and skip speculative calls. An
+exhausted budget makes LLM calls raise TokenBudgetExceeded, and callers
+fall back to cached or non-LLM results instead of failing.
+"""
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import document_store
+from metrics import Counter
+
+feature_tokens_total = Counter("ez_llm_feature_tokens_total", "LLM tokens by feature", ("feature", "kind"))
+llm_cost_usd_total = Counter("ez_llm_cost_usd_total", "Estimated LLM cost in USD", ("feature",))
+budget_degradations_total = Counter(
+    "ez_token_budget_degradations_total", "Calls degraded by a token budget", ("feature", "level")
+)
+
+# USD per million (prompt, completion) tokens; unknown models cost 0
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+_tags = contextvars.ContextVar("ez_usage_tags", default={})
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised instead of an LLM call once the document or session budget is used up"""
+
+
+def _merged(tags):
+    return {**_tags.get(), **{name: value for name, value in tags.items() if value is not None}}
+
+
+def bind(**tags):
+    """Tag LLM calls for the rest of the current context (e.g. one Streamlit run)"""
+    _tags.set(_merged(tags))
+
+
+@contextmanager
+def scope(**tags):
+    """Tag LLM calls made inside the block; feature, doc_hash and session_id are used"""
+    token = _tags.set(_merged(tags))
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def current_tags():
+    return dict(_tags.get())
+
+
+def cost_usd(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+class UsageLedger:
+    def __init__(self, directory=None, flush_seconds=None, document_budget=None, session_budget=None,
+                 low_fraction=None):
+        self.directory = directory or os.getenv("EZ_USAGE_DIR") or os.path.join(document_store.STORE_DIR, "usage")
+        self.flush_seconds = float(flush_seconds or os.getenv("EZ_USAGE_FLUSH_SECONDS", "60"))
+        self.document_budget = int(document_budget if document_budget is not None
+                                   else os.getenv("EZ_TOKEN_BUDGET_DOCUMENT", "0"))
+        self.session_budget = int(session_budget if session_budget is not None
+                                  else os.getenv("EZ_TOKEN_BUDGET_SESSION", "0"))
+        self.low_fraction = float(low_fraction if low_fraction is not None
+                                  else os.getenv("EZ_TOKEN_BUDGET_LOW_FRACTION", "0.2"))
+        # (feature, doc_hash, session_id, model) -> [prompt, completion, calls, cost]
+        self._totals = {}
+        self._pending = {}
+        # Today's tokens for budgets, seeded from earlier flushes
+        self._day = None
+        self._by_document = {}
+        self._by_session = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"usage-{day}.jsonl")
+
+    def _roll_day(self):
+        day = time.strftime("%Y-%m-%d", time.gmtime())
+        if day == self._day:
+            return
+        self._day = day
+        self._by_document = {}
+        self._by_session = {}
+        # Usage flushed by earlier runs and other workers counts against today's
+        # budgets; later flushes by other workers are only seen after a restart
+        try:
+            with open(self._path(day), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._count(entry.get("doc_hash"), entry.get("session_id"),
+                                entry.get("prompt_tokens", 0) + entry.get("completion_tokens", 0))
+        except FileNotFoundError:
+            pass
+
+    def _count(self, doc_hash, session_id, tokens):
+        if doc_hash:
+            self._by_document[doc_hash] = self._by_document.get(doc_hash, 0) + tokens
+        if session_id:
+            self._by_session[session_id] = self._by_session.get(session_id, 0) + tokens
+
+    def record(self, prompt_tokens, completion_tokens, model="", feature=None):
+        """Add one call's tokens under the current feature, document and session tags"""
+        tags = _tags.get()
+        feature = feature or tags.get("feature", "other")
+        doc_hash = tags.get("doc_hash", "")
+        session_id = tags.get("session_id", "")
+        cost = cost_usd(model, prompt_tokens, completion_tokens)
+        key = (feature, doc_hash, session_id, model)
+        with self._lock:
+            self._roll_day()
+            for table in (self._totals, self._pending):
+                entry = table.setdefault(key, [0, 0, 0, 0.0])
+                entry[0] += prompt_tokens
+                entry[1] += completion_tokens
+                entry[2] += 1
+                entry[3] += cost
+            self._count(doc_hash, session_id, prompt_tokens + completion_tokens)
+            self._start_flusher()
+        feature_tokens_total.inc(prompt_tokens, feature=feature, kind="prompt")
+        feature_tokens_total.inc(completion_tokens, feature=feature, kind="completion")
+        llm_cost_usd_total.inc(cost, feature=feature)
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.flush_seconds)
+                self.flush()
+
+        self._flusher = threading.Thread(target=loop, name="usage-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def flush(self):
+        """Append usage since the last flush to today's file"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            day = self._day
+        if not pending:
+            return
+        now = time.time()
+        lines = "".join(
+            json.dumps({
+                "ts": now,
+                "feature": feature,
+                "doc_hash": doc_hash,
+                "session_id": session_id,
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "calls": calls,
+                "cost_usd": round(cost, 8),
+            }) + "\n"
+            for (feature, doc_hash, session_id, model), (prompt_tokens, completion_tokens, calls, cost)
+            in pending.items()
+        )
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # One append per flush keeps lines from concurrent workers whole
+            with open(self._path(day), "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            print(f"⚠️ Could not write token usage: {e}")
+
+    def remaining_fraction(self, doc_hash=None, session_id=None):
+        """Smallest share left of the configured budgets; None when none apply"""
+        tags = _tags.get()
+        doc_hash = doc_hash or tags.get("doc_hash")
+        session_id = session_id or tags.get("session_id")
+        fractions = []
+        with self._lock:
+            self._roll_day()
+            if self.document_budget and doc_hash:
+                fractions.append(1 - self._by_document.get(doc_hash, 0) / self.document_budget)
+            if self.session_budget and session_id:
+                fractions.append(1 - self._by_session.get(session_id, 0) / self.session_budget)
+        return min(fractions) if fractions else None
+
+    def level(self, doc_hash=None, session_id=None):
+        """"ok", "low" or "exhausted" for the current (or given) document and session"""
+        fraction = self.remaining_fraction(doc_hash, session_id)
+        if fraction is None or fraction > self.low_fraction:
+            return "ok"
+        return "low" if fraction > 0 else "exhausted"
+
+    def check(self):
+        if self.level() == "exhausted":
+            raise TokenBudgetExceeded("Token budget for this document or session is used up")
+
+    def degraded(self, feature, level):
+        budget_degradations_total.inc(feature=feature, level=level)
+        print(f"🪙 Token budget {level}: degrading {feature}")
+
+    def report(self, doc_hash=None, session_id=None):
+        """Tokens and cost by feature, optionally for one document and/or session"""
+        features = {}
+        with self._lock:
+            for (feature, entry_doc, entry_session, _), values in self._totals.items():
+                if doc_hash and entry_doc != doc_hash or session_id and entry_session != session_id:
+                    continue
+                totals = features.setdefault(feature, [0, 0, 0, 0.0])
+                for i, value in enumerate(values):
+                    totals[i] += value
+        report = {
+            "features": {
+                feature: {"prompt_tokens": p, "completion_tokens": c, "calls": n, "cost_usd": round(cost, 6)}
+                for feature, (p, c, n, cost) in sorted(features.items())
+            },
+            "prompt_tokens": sum(values[0] for values in features.values()),
+            "completion_tokens": sum(values[1] for values in features.values()),
+            "cost_usd": round(sum(values[3] for values in features.values()), 6),
+        }
+        report["level"] = self.level(doc_hash, session_id)
+        return report
+
+
+ledger = UsageLedger()
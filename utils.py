@@ -1,8 +1,31 @@
-import fitz  # PyMuPDF
-
 def extract_text_from_pdf(uploaded_file):
+    import fitz  # PyMuPDF
     doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
     return "\n".join([page.get_text() for page in doc])
 
 def extract_text_from_txt(uploaded_file):
     return uploaded_file.read().decode("utf-8")
+
+def extract_text_and_pages_from_pdf(uploaded_file):
+    """Extract text plus the character offset where each page starts"""
+    import fitz  # PyMuPDF
+    doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
+    pages = [page.get_text() for page in doc]
+    page_starts = []
+    offset = 0
+    for page_text in pages:
+        page_starts.append(offset)
+        offset += len(page_text) + 1
+    return "\n".join(pages), page_starts
+
+def extract_uploaded_file(uploaded_file):
+    """(text, page_starts) for an uploaded PDF or TXT.
+
+    Built by the same extractors as batch_cli.py and api.py, so the app
+    computes the same document hash and finds their stored indexes.
+    """
+    if uploaded_file.type == "application/pdf":
+        return extract_text_and_pages_from_pdf(uploaded_file)
+    if uploaded_file.type == "text/plain":
+        return extract_text_from_txt(uploaded_file), None
+    raise ValueError("Unsupported file format. Please upload PDF or TXT files only.")